@@ -0,0 +1,93 @@
+"""Benchmark konversi kolom upload: schema.coerce_dataframe vs jalur lama apply/astype(errors="ignore").
+
+Data sintetis 100k baris Industri dengan bentuk seperti hasil pd.read_excel: boolean campuran
+teks/bool/angka, kolom angka float berisi NaN, NIB terbaca sebagai angka. Jalur lama disalin dari
+siapkan_dataframe sebelum skema deklaratif. Jalankan dari root repo:
+
+    python bench/bench_coerce.py [jumlah_baris]
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema import COERCERS, INDUSTRI_COLUMNS, TABLE_SCHEMAS, coerce_dataframe  # noqa: E402
+
+ULANGAN = 3
+
+BOOLEAN_COLUMNS = ["NIB_Available", "Trapis_Available", "CHSE", "Dapur_Halal", "Sertifikat_Halal", "Standar_Available"]
+STRING_COLUMNS = ["NIB", "Sertifikat_Standar", "Trapis"]
+INTEGER_COLUMNS_INDUSTRI = ["Karyawan_Pria", "Karyawan_Wanita", "Jumlah_Kamar", "Jumlah_Bed", "Bintang_Hotel", "Jumlah_Kursi"]
+
+
+def siapkan_dataframe_lama(df, table_name):
+    for col in BOOLEAN_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].apply(lambda x: True if str(x).lower() in ["true", "1", "ya"] else False if str(x).lower() in ["false", "0", "tidak"] else None)
+
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).replace("nan", None)
+
+    if table_name == "Industri":
+        for col in INTEGER_COLUMNS_INDUSTRI:
+            if col in df.columns:
+                df[col] = df[col].astype("Int64", errors="ignore")
+    return df
+
+
+def coerce_kolom_lama(df, table_name):
+    # coerce_dataframe terbatas pada kolom yang juga dikonversi jalur lama, agar sebanding
+    schema = TABLE_SCHEMAS[table_name]
+    for col in BOOLEAN_COLUMNS + STRING_COLUMNS + INTEGER_COLUMNS_INDUSTRI:
+        df[col], _ = COERCERS[schema[col]](df[col])
+    return df
+
+
+def data_industri(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {col: rng.choice(["Teks A", "Teks B ", None], rows) for col in INDUSTRI_COLUMNS}
+    for col in BOOLEAN_COLUMNS:
+        data[col] = rng.choice(np.array(["Ya", "Tidak", True, False, 1, 0, None], dtype=object), rows)
+    for col in INTEGER_COLUMNS_INDUSTRI:
+        values = rng.integers(0, 200, rows).astype(float)
+        values[rng.random(rows) < 0.2] = np.nan
+        data[col] = values
+    nib = rng.integers(10 ** 12, 10 ** 13, rows).astype(float)
+    nib[rng.random(rows) < 0.3] = np.nan
+    data["NIB"] = nib
+    return pd.DataFrame(data)
+
+
+def ukur(fn, df):
+    terbaik = float("inf")
+    for _ in range(ULANGAN):
+        salinan = df.copy()
+        started = time.perf_counter()
+        fn(salinan, "Industri")
+        terbaik = min(terbaik, time.perf_counter() - started)
+    return terbaik
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = data_industri(rows)
+    # astype(errors="ignore") sudah deprecated di pandas 2.2; peringatannya tidak relevan di sini
+    warnings.simplefilter("ignore", FutureWarning)
+    lama = ukur(siapkan_dataframe_lama, df)
+    sebanding = ukur(coerce_kolom_lama, df)
+    baru = ukur(coerce_dataframe, df)
+    kolom_lama = len(BOOLEAN_COLUMNS + STRING_COLUMNS + INTEGER_COLUMNS_INDUSTRI)
+    print(f"{rows} baris, {len(df.columns)} kolom, waktu terbaik dari {ULANGAN} ulangan")
+    print(f"apply/astype lama ({kolom_lama} kolom)       : {lama * 1000:8.1f} ms")
+    print(f"coerce, kolom yang sama ({kolom_lama} kolom) : {sebanding * 1000:8.1f} ms  ({lama / sebanding:.1f}x)")
+    print(f"coerce_dataframe ({len(df.columns)} kolom)        : {baru * 1000:8.1f} ms  ({lama / baru:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
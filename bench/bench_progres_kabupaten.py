@@ -0,0 +1,82 @@
+"""Benchmark progres admin: RPC hitung_progres_kabupaten vs fallback hitungan per kabupaten.
+
+Session Supabase diganti stub dengan latensi buatan per request, jadi hasilnya menunjukkan
+jumlah round-trip dan efek paralelisme, bukan kecepatan database. Jalankan dari root repo:
+
+    python bench/bench_progres_kabupaten.py [latensi_ms]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st  # noqa: E402
+
+import supabase_client  # noqa: E402
+import utils  # noqa: E402
+
+JUMLAH_KABUPATEN = [6, 12, 24]
+ULANGAN = 3
+
+
+class Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.headers = {}
+        self.text = ""
+
+    def json(self):
+        return self._body
+
+
+class LatencySession:
+    """Stub requests.Session: setiap request tidur `latency` detik. RPC bisa dimatikan (404 tanpa latensi)."""
+
+    def __init__(self, latency, rpc_tersedia):
+        self.latency = latency
+        self.rpc_tersedia = rpc_tersedia
+        self.jumlah_request = 0
+
+    def request(self, method, url, json=None, **kwargs):
+        if "/rpc/" in url and not self.rpc_tersedia:
+            return Response(404, {"message": "function not found"})
+        self.jumlah_request += 1
+        time.sleep(self.latency)
+        if "/rpc/" in url:
+            rows = [{"kabupaten": kab, "jumlah_destinasi": 3, "jumlah_industri": 5} for kab in json["kabupaten_list"]]
+            return Response(200, rows)
+        return Response(200, [{"count": 3}])
+
+
+def ukur(kabupaten_list, latency, rpc_tersedia):
+    session = LatencySession(latency, rpc_tersedia)
+    supabase_client.get_session = lambda: session
+    terbaik = float("inf")
+    for _ in range(ULANGAN):
+        session.jumlah_request = 0
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, _, errors = utils.get_progres_kabupaten(kabupaten_list)
+        terbaik = min(terbaik, time.perf_counter() - started)
+        assert not errors, errors
+    return terbaik, session.jumlah_request
+
+
+def main():
+    latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.05
+    st.secrets = {"SUPABASE_URL": "https://bench.supabase.co", "SUPABASE_API_KEY": "anon-key"}
+    print(f"Latensi per request: {latency * 1000:.0f} ms, waktu terbaik dari {ULANGAN} ulangan")
+    print(f"{'N':>4} {'RPC (ms)':>10} {'req':>5} {'fan-out (ms)':>13} {'req':>5} {'rasio':>7}")
+    for n in JUMLAH_KABUPATEN:
+        kabupaten_list = [f"Kabupaten Contoh {i}" for i in range(n)]
+        rpc, rpc_req = ukur(kabupaten_list, latency, rpc_tersedia=True)
+        fanout, fanout_req = ukur(kabupaten_list, latency, rpc_tersedia=False)
+        print(f"{n:>4} {rpc * 1000:>10.1f} {rpc_req:>5} {fanout * 1000:>13.1f} {fanout_req:>5} {fanout / rpc:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark serialisasi batch upload: DataFrame.to_json vs to_dict(orient="records") + simplejson.dumps.
+
+Jalur lama (sebelum serialisasi_batch) mengubah seluruh DataFrame ke object dengan NA menjadi None,
+lalu setiap batch diubah menjadi list dict dan di-dump. simplejson opsional; tanpa simplejson
+dipakai json bawaan (NA sudah None, jadi hasilnya sama). Jalankan dari root repo:
+
+    python bench/bench_serialisasi.py [jumlah_baris]
+"""
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_coerce import data_industri  # noqa: E402
+from bulk_upload import BATCH_SIZE, serialisasi_batch, siapkan_untuk_kirim  # noqa: E402
+from schema import coerce_dataframe  # noqa: E402
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+ULANGAN = 3
+TANGGAL = "2025-01-01"
+
+
+def dumps_lama(records):
+    if simplejson is not None:
+        return simplejson.dumps(records, ignore_nan=True)
+    return json.dumps(records)
+
+
+def siapkan_lama(df):
+    df = df.assign(Tanggal_Input=TANGGAL)
+    return df.astype(object).where(pd.notnull(df), None)
+
+
+def kirim_lama(df):
+    df = siapkan_lama(df)
+    total = 0
+    for start in range(0, len(df), BATCH_SIZE):
+        total += len(dumps_lama(df.iloc[start:start + BATCH_SIZE].to_dict(orient="records")).encode("utf-8"))
+    return total
+
+
+def kirim_baru(df):
+    df = siapkan_untuk_kirim(df, TANGGAL)
+    total = 0
+    for start in range(0, len(df), BATCH_SIZE):
+        body, _ = serialisasi_batch(df.iloc[start:start + BATCH_SIZE], compress=False)
+        total += len(body)
+    return total
+
+
+def ukur(fn, df):
+    terbaik = float("inf")
+    for _ in range(ULANGAN):
+        started = time.perf_counter()
+        total_bytes = fn(df)
+        terbaik = min(terbaik, time.perf_counter() - started)
+    return terbaik, total_bytes
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df, _ = coerce_dataframe(data_industri(rows), "Industri")
+
+    # Kedua jalur harus menghasilkan record yang sama sebelum waktunya dibandingkan
+    sampel = df.iloc[:BATCH_SIZE]
+    lama_records = json.loads(dumps_lama(siapkan_lama(sampel).to_dict(orient="records")))
+    baru_records = json.loads(serialisasi_batch(siapkan_untuk_kirim(sampel, TANGGAL), compress=False)[0])
+    assert lama_records == baru_records
+
+    lama, lama_bytes = ukur(kirim_lama, df)
+    baru, baru_bytes = ukur(kirim_baru, df)
+    pustaka = "simplejson" if simplejson is not None else "json"
+    print(f"{rows} baris, batch {BATCH_SIZE}, waktu terbaik dari {ULANGAN} ulangan")
+    print(f"to_dict + {pustaka}.dumps : {lama * 1000:8.1f} ms  {rows / lama:>10,.0f} baris/detik  {lama_bytes / 1e6:6.1f} MB")
+    print(f"to_json{'':>{len(pustaka) + 10}}: {baru * 1000:8.1f} ms  {rows / baru:>10,.0f} baris/detik  {baru_bytes / 1e6:6.1f} MB  ({lama / baru:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+import gzip
+import hashlib
+import io
+import random
+import time
+import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+import openpyxl
+import pandas as pd
+import requests
+import streamlit as st
+
+import supabase_client
+from cache import TTLCache
+from schema import DESTINASI_COLUMNS, INDUSTRI_COLUMNS, NATURAL_KEYS, coerce_dataframe, schema_for
+from utils import ambil_baris_by_in, cari_nama_usaha_terdaftar, tandai_nama_usaha_terdaftar
+from validation import validasi_dataframe
+
+# Jumlah baris per request insert ke PostgREST
+BATCH_SIZE = 500
+# Kompresi gzip body request (Content-Encoding: gzip); aktifkan hanya jika gateway/PostgREST
+# di depan database mendukung body terkompresi
+GZIP_REQUESTS = False
+GZIP_MIN_BYTES = 64 * 1024
+# Jumlah batch yang dikirim bersamaan
+UPLOAD_WORKERS = 4
+# Percobaan ulang per batch untuk error sementara (5xx, 429, koneksi)
+BATCH_RETRIES = 3
+# File di atas ukuran ini dibaca dan dikirim per potongan (streaming) secara default
+STREAMING_THRESHOLD_BYTES = 10 * 1024 * 1024
+# Jumlah baris yang dibaca untuk preview di mode streaming
+PREVIEW_ROWS = 200
+# Jumlah baris per halaman preview (baris lain tidak dikirim ke browser)
+PREVIEW_PAGE_ROWS = 50
+# Batas memori cache hasil parse upload (dipakai ulang antar rerun Streamlit)
+PARSED_UPLOAD_CACHE_BYTES = 256 * 1024 * 1024
+PARSED_UPLOAD_CACHE_TTL = 3600
+# Batas memori cache workbook Excel hasil "Download Ulang"
+EXCEL_EXPORT_CACHE_BYTES = 128 * 1024 * 1024
+
+# Tabel tujuan untuk file yang kolomnya tidak cocok dengan template mana pun
+DEFAULT_TABLE = "Destinasi Wisata"
+
+# Mode kirim: insert biasa, atau upsert berdasarkan schema.NATURAL_KEYS
+MODE_INSERT = "insert"
+MODE_UPSERT = "upsert"
+
+def is_csv(uploaded_file):
+    return uploaded_file.name.endswith(".csv")
+
+
+def baca_file(uploaded_file):
+    """Baca seluruh file upload menjadi satu DataFrame."""
+    if is_csv(uploaded_file):
+        return pd.read_csv(uploaded_file, encoding="utf-8", encoding_errors="replace")
+    return pd.read_excel(uploaded_file, engine="openpyxl")
+
+
+def _iter_xlsx_chunks(uploaded_file, chunk_rows):
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        buffer = []
+        offset = 0
+        kosong = 0
+        for row in rows:
+            # Sama seperti pd.read_excel: baris kosong di tengah tetap dihitung (semua NaN) agar nomor
+            # baris cocok dengan mode non-streaming, tetapi baris kosong di akhir sheet dibuang
+            if all(value is None for value in row):
+                kosong += 1
+                continue
+            buffer.extend([(None,) * len(columns)] * kosong)
+            kosong = 0
+            buffer.append(row[:len(columns)])
+            while len(buffer) >= chunk_rows:
+                yield pd.DataFrame.from_records(buffer[:chunk_rows], columns=columns, index=pd.RangeIndex(offset, offset + chunk_rows))
+                offset += chunk_rows
+                buffer = buffer[chunk_rows:]
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns, index=pd.RangeIndex(offset, offset + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(uploaded_file, chunk_rows):
+    """Baca file upload per potongan `chunk_rows` baris tanpa memuat seluruh isi file ke DataFrame.
+
+    CSV dibaca dengan `chunksize` pandas, XLSX dengan mode `read_only` openpyxl.
+    """
+    uploaded_file.seek(0)
+    if is_csv(uploaded_file):
+        with pd.read_csv(uploaded_file, encoding="utf-8", encoding_errors="replace", chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        yield from _iter_xlsx_chunks(uploaded_file, chunk_rows)
+
+
+def baca_preview(uploaded_file, rows=PREVIEW_ROWS):
+    chunks = iter_file_chunks(uploaded_file, rows)
+    try:
+        return next(chunks, pd.DataFrame())
+    finally:
+        chunks.close()
+        uploaded_file.seek(0)
+
+
+def perkiraan_jumlah_baris(uploaded_file):
+    """Perkiraan jumlah baris data untuk progress bar di mode streaming (None jika tidak diketahui)."""
+    uploaded_file.seek(0)
+    try:
+        if is_csv(uploaded_file):
+            lines = sum(block.count(b"\n") for block in iter(lambda: uploaded_file.read(1024 * 1024), b""))
+            return max(lines - 1, 0)
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True)
+        try:
+            max_row = workbook.worksheets[0].max_row
+        finally:
+            workbook.close()
+        return max_row - 1 if max_row else None
+    finally:
+        uploaded_file.seek(0)
+
+
+def hash_upload(uploaded_file):
+    """SHA-256 isi file upload, dihitung langsung dari buffer tanpa menyalin bytes."""
+    return hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+
+
+def salin_upload(uploaded_file):
+    """Salinan isi file upload dengan posisi baca sendiri, aman dibaca job latar belakang selama script rerun."""
+    salinan = io.BytesIO(uploaded_file.getbuffer())
+    salinan.name = uploaded_file.name
+    return salinan
+
+
+def _ukuran_dataframe(value):
+    df = value["df"]
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+parsed_upload_cache = TTLCache(
+    maxsize=32,
+    ttl=PARSED_UPLOAD_CACHE_TTL,
+    maxweight=PARSED_UPLOAD_CACHE_BYTES,
+    weigher=_ukuran_dataframe,
+)
+
+
+def baca_dan_siapkan(uploaded_file):
+    """Baca, konversi dan validasi file upload, memakai ulang hasil sebelumnya untuk isi file yang sama.
+
+    Mengembalikan dict berisi file_hash, ringkasan (statistik per kolom), jenis_industri (jumlah
+    baris per Jenis_Industri, None jika kolomnya tidak ada), sampel (indeks baris sampel acak),
+    df, table_name, jenis_data, error_mask (hasil konversi), valid (mask baris yang lolos
+    validasi) dan laporan (DataFrame Baris/Masalah untuk baris yang ditolak).
+    Hasilnya dipakai bersama lintas rerun dan sesi, jadi salin dulu (`df.copy()`) sebelum mengubahnya.
+    """
+    file_hash = hash_upload(uploaded_file)
+    cache_key = (file_hash, is_csv(uploaded_file))
+    cached = parsed_upload_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    uploaded_file.seek(0)
+    df = baca_file(uploaded_file)
+    table_name, jenis_data = tentukan_tabel(df.columns)
+    df, error_mask = siapkan_dataframe(df, table_name)
+    valid, laporan = validasi_dataframe(df, table_name, error_mask)
+    result = {
+        "file_hash": file_hash,
+        "ringkasan": ringkas_kolom(df, error_mask),
+        "jenis_industri": ringkas_jenis_industri(df),
+        "sampel": df.sample(min(PREVIEW_PAGE_ROWS, len(df)), random_state=0).index.sort_values(),
+        "df": df,
+        "table_name": table_name,
+        "jenis_data": jenis_data,
+        "error_mask": error_mask,
+        "valid": valid,
+        "laporan": laporan,
+    }
+    parsed_upload_cache.set(cache_key, result)
+    return result
+
+
+def ringkas_kolom(df, error_mask=None):
+    """Statistik per kolom untuk preview: tipe, jumlah terisi/kosong, gagal konversi dan nilai unik."""
+    gagal = error_mask.sum() if error_mask is not None else pd.Series(dtype="int64")
+    return pd.DataFrame({
+        "Kolom": df.columns,
+        "Tipe": [str(dtype) for dtype in df.dtypes],
+        "Terisi": df.notna().sum().to_numpy(),
+        "Kosong": df.isna().sum().to_numpy(),
+        "Gagal Konversi": gagal.reindex(df.columns, fill_value=0).astype(int).to_numpy(),
+        "Nilai Unik": df.nunique(dropna=True).to_numpy(),
+    })
+
+
+def ringkas_jenis_industri(df):
+    if "Jenis_Industri" not in df.columns:
+        return None
+    counts = df["Jenis_Industri"].fillna("(kosong)").value_counts()
+    return counts.rename_axis("Jenis_Industri").reset_index(name="Jumlah Baris")
+
+
+def tulis_excel(df):
+    """Tulis DataFrame ke bytes XLSX dengan mode write-only openpyxl (baris ditulis satu per satu)."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    # NA dari dtype nullable tidak dikenali openpyxl, jadi ditulis sebagai sel kosong
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def template_excel(columns):
+    """Template Excel kosong berisi header `columns` (tuple), dibuat sekali per proses."""
+    return tulis_excel(pd.DataFrame(columns=list(columns)))
+
+
+excel_export_cache = TTLCache(
+    maxsize=16,
+    ttl=PARSED_UPLOAD_CACHE_TTL,
+    maxweight=EXCEL_EXPORT_CACHE_BYTES,
+    weigher=len,
+)
+
+
+def excel_upload(file_hash, df=None):
+    """Bytes XLSX "Download Ulang" untuk data upload dengan hash `file_hash`.
+
+    Jika belum ada di cache dan `df` diisi, workbook dibuat lalu disimpan; jika `df` None hanya
+    cache yang dicek (None jika belum pernah dibuat).
+    """
+    data = excel_export_cache.get(file_hash)
+    if data is None and df is not None:
+        data = tulis_excel(df)
+        excel_export_cache.set(file_hash, data)
+    return data
+
+
+def tentukan_tabel(columns):
+    """Tentukan tabel tujuan berdasarkan kolom. Mengembalikan (table_name, jenis_data) atau (None, None)."""
+    uploaded_columns = set(columns)
+    if set(DESTINASI_COLUMNS).issubset(uploaded_columns):
+        return "Destinasi Wisata", "Destinasi"
+    if set(INDUSTRI_COLUMNS).issubset(uploaded_columns):
+        return "Industri", "Industri"
+    return None, None
+
+
+def tabel_tujuan(table_name):
+    """Tabel Supabase yang dituju; file tanpa template yang cocok (`table_name` None) ke DEFAULT_TABLE."""
+    return table_name or DEFAULT_TABLE
+
+
+def siapkan_dataframe(df, table_name):
+    """Konversi kolom sesuai skema tabel. Mengembalikan (df, error_mask), lihat schema.coerce_dataframe."""
+    return coerce_dataframe(df, table_name)
+
+
+def cek_duplikat(df, table_name, valid, offset=0, seen=None, mode=MODE_INSERT):
+    """Tandai baris duplikat sebelum dikirim. Hanya baris `valid` yang dicek.
+
+    Mode insert: baris Industri yang Nama_Usaha-nya sudah ada di database atau muncul lebih dulu
+    di file. Mode upsert: baris yang kunci alaminya (schema.NATURAL_KEYS) muncul lebih dulu di file,
+    karena baris yang sudah ada di database justru akan diperbarui. `seen` (set, opsional) menyimpan
+    kunci dari potongan sebelumnya di mode streaming dan akan diperbarui. Mengembalikan
+    (valid, laporan, errors): mask valid baru, laporan Baris/Masalah untuk baris duplikat, dan
+    error pengecekan ke database.
+    """
+    laporan = pd.DataFrame(columns=["Baris", "Masalah"])
+    if mode == MODE_UPSERT:
+        keys = NATURAL_KEYS.get(table_name)
+        if not keys or not set(keys).issubset(df.columns):
+            return valid, laporan, {}
+        key_values = pd.Series(list(zip(*(df[key] for key in keys))), index=df.index).where(valid.to_numpy())
+        dalam_file = key_values.notna() & key_values.duplicated(keep="first")
+        if seen:
+            dalam_file |= key_values.isin(seen)
+        if seen is not None:
+            seen.update(key_values.dropna())
+        duplikat = dalam_file.fillna(False).astype(bool).to_numpy()
+        if duplikat.any():
+            laporan = pd.DataFrame({
+                "Baris": duplikat.nonzero()[0] + 1 + offset,
+                "Masalah": f"{' + '.join(keys)} duplikat di dalam file",
+            })
+        return valid & ~duplikat, laporan, {}
+
+    if table_name != "Industri" or "Nama_Usaha" not in df.columns:
+        return valid, laporan, {}
+
+    names = df["Nama_Usaha"].where(valid.to_numpy())
+    dalam_file = names.notna() & names.duplicated(keep="first")
+    if seen:
+        dalam_file |= names.isin(seen)
+    terdaftar, errors = cari_nama_usaha_terdaftar(names.dropna().unique())
+    di_database = names.notna() & names.isin(terdaftar)
+    if seen is not None:
+        seen.update(names.dropna())
+
+    dalam_file = dalam_file.fillna(False).astype(bool).to_numpy()
+    di_database = di_database.fillna(False).astype(bool).to_numpy()
+    duplikat = dalam_file | di_database
+    if duplikat.any():
+        laporan = pd.DataFrame({
+            "Baris": duplikat.nonzero()[0] + 1 + offset,
+            "Masalah": [
+                "Nama_Usaha sudah ada di database" if db else "Nama_Usaha duplikat di dalam file"
+                for db in di_database[duplikat]
+            ],
+        })
+    return valid & ~duplikat, laporan, errors
+
+
+def saring_baris_berubah(table_name, chunk):
+    """Diff lokal untuk mode upsert: buang baris yang isinya sama persis dengan data di database.
+
+    Baris di database dicari berdasarkan kunci alami dengan filter `in.(...)`. Jika pengecekan
+    gagal, seluruh chunk dikembalikan (upsert tetap aman dikirim ulang).
+    """
+    keys = NATURAL_KEYS[table_name]
+    schema = schema_for(table_name)
+    kolom = [col for col in chunk.columns if col in schema]
+    existing, errors = ambil_baris_by_in(table_name, keys[0], chunk[keys[0]].dropna().unique(), kolom)
+    if errors:
+        print(f"⚠️ Diff upsert dilewati, gagal mengambil data lama dari {table_name}: {errors}")
+        return chunk
+    if not existing:
+        return chunk
+
+    lama, _ = coerce_dataframe(pd.DataFrame(existing, columns=kolom), table_name)
+    baru, _ = coerce_dataframe(chunk[kolom].reset_index(drop=True), table_name)
+    lama = lama.drop_duplicates(keys)
+    merged = baru.merge(lama, on=keys, how="left", suffixes=("", "_lama"), indicator=True)
+    berubah = (merged["_merge"] == "left_only").to_numpy()
+    for col in kolom:
+        if col in keys:
+            continue
+        a, b = merged[col], merged[f"{col}_lama"]
+        sama = (a == b).fillna(False).astype(bool) | (a.isna() & b.isna())
+        berubah |= ~sama.to_numpy()
+    return chunk[berubah]
+
+
+def siapkan_untuk_kirim(df, tanggal_input):
+    # Dtype nullable (Int64, boolean, string) dibiarkan; NA/NaN ditulis sebagai null oleh serialisasi_batch
+    return df.assign(Tanggal_Input=tanggal_input)
+
+
+def serialisasi_batch(chunk, compress=GZIP_REQUESTS):
+    """Tulis chunk langsung dari DataFrame kolumnar menjadi body JSON array of objects.
+
+    Tidak membuat dict per baris: NaN/None/pd.NA menjadi null, Int64 tetap bilangan bulat,
+    tanggal ditulis ISO 8601. Jika `compress` aktif dan body cukup besar, body di-gzip.
+    Mengembalikan (body bytes, header tambahan).
+    """
+    body = chunk.to_json(orient="records", force_ascii=False, date_format="iso", double_precision=15).encode("utf-8")
+    if compress and len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=5), {"Content-Encoding": "gzip"}
+    return body, {}
+
+
+def iter_batches(df, batch_size=BATCH_SIZE, valid=None):
+    """Potong DataFrame menjadi (start, end, chunk) dengan start/end indeks baris 0-based, end eksklusif.
+
+    Jika `valid` diisi, baris yang tidak valid dibuang dari chunk tetapi rentang start/end tetap
+    mengacu ke posisi baris di file asli.
+    """
+    for start in range(0, len(df), batch_size):
+        end = min(start + batch_size, len(df))
+        chunk = df.iloc[start:end]
+        if valid is not None:
+            chunk = chunk[valid.iloc[start:end].to_numpy()]
+        yield start, end, chunk
+
+
+def format_rentang_baris(start, end):
+    # Nomor baris data 1-based seperti yang dilihat operator di spreadsheet (tanpa header)
+    return f"{start + 1}-{end}" if end - start > 1 else f"{start + 1}"
+
+
+def kirim_batch(table_name, chunk, mode=MODE_INSERT):
+    """Insert (atau upsert) satu potongan DataFrame ke tabel Supabase dengan `return=minimal`.
+
+    Mode upsert memakai `on_conflict` kunci alami dan `resolution=merge-duplicates`.
+
+    Request dikirim sekali (retry diatur kirim_batch_dengan_retry). Mengembalikan tuple
+    (error, retryable): error None jika berhasil, retryable True jika batch aman dikirim ulang.
+    Insert hanya diulang jika server jelas belum memproses request (429/503, atau koneksi gagal
+    dibuka menurut supabase_client.gagal_sebelum_terkirim), karena setelah 5xx lain, read timeout
+    atau koneksi terputus baris mungkin sudah tersimpan dan akan menjadi ganda. Upsert bersifat
+    idempoten, jadi semua error sementara boleh diulang.
+    """
+    idempotent = mode == MODE_UPSERT
+    retryable_status = supabase_client.RETRYABLE_STATUS if idempotent else supabase_client.RETRYABLE_STATUS_NON_IDEMPOTENT
+    body, extra_headers = serialisasi_batch(chunk)
+    url = f"{st.secrets['SUPABASE_URL']}/rest/v1/{urllib.parse.quote(tabel_tujuan(table_name))}"
+    prefer = "return=minimal"
+    if mode == MODE_UPSERT:
+        url += f"?on_conflict={urllib.parse.quote(','.join(NATURAL_KEYS[table_name]), safe=',')}"
+        prefer = "resolution=merge-duplicates,return=minimal"
+    try:
+        res = supabase_client.post(
+            url,
+            retries=0,
+            data=body,
+            headers={
+                **supabase_client.anon_headers(),
+                **extra_headers,
+                "Content-Type": "application/json",
+                "Prefer": prefer
+            }
+        )
+    except requests.RequestException as e:
+        return str(e), idempotent or supabase_client.gagal_sebelum_terkirim(e)
+
+    if res.status_code in (200, 201, 204):
+        return None, False
+    retryable = res.status_code in retryable_status
+    try:
+        return f"{res.status_code} - {res.json().get('message', res.text)}", retryable
+    except ValueError:
+        return f"{res.status_code} - {res.text or 'Unknown error'}", retryable
+
+
+def kirim_batch_dengan_retry(table_name, chunk, mode=MODE_INSERT, retries=BATCH_RETRIES):
+    attempt = 0
+    while True:
+        error, retryable = kirim_batch(table_name, chunk, mode)
+        if error is None or not retryable or attempt >= retries:
+            return error
+        attempt += 1
+        wait = random.uniform(0, min(supabase_client.RETRY_MAX_BACKOFF, supabase_client.RETRY_BACKOFF * 2 ** attempt))
+        print(f"🔁 Kirim ulang batch ke {tabel_tujuan(table_name)} (percobaan ke-{attempt + 1}) dalam {wait:.2f} detik: {error}")
+        time.sleep(wait)
+
+
+def proses_batch(table_name, chunk, mode=MODE_INSERT):
+    """Kerjakan satu batch di worker. Mengembalikan (error, rows_sent)."""
+    if mode == MODE_UPSERT:
+        chunk = saring_baris_berubah(table_name, chunk)
+        if chunk.empty:
+            return None, 0
+    return kirim_batch_dengan_retry(table_name, chunk, mode), len(chunk)
+
+
+def kirim_batches(table_name, batches, total_rows=None, max_workers=UPLOAD_WORKERS, on_progress=None, mode=MODE_INSERT, journal=None):
+    """Kirim potongan (start, end, chunk) ke Supabase lewat beberapa worker paralel.
+
+    Batch kosong (semua barisnya ditolak validasi) dilewati. Batch yang gagal karena error
+    sementara dikirim ulang dengan backoff. Di mode upsert, baris yang tidak berubah dibuang
+    dulu oleh saring_baris_berubah. Paling banyak 2 × `max_workers` batch menunggu di memori,
+    sehingga `batches` boleh berupa generator yang membaca file sedikit demi sedikit.
+    `on_progress(progress)` dipanggil dari thread pemanggil setelah tiap batch selesai, dengan
+    dict berisi rows_done, rows_sent, total_rows (boleh None), start, end, error dan
+    rows_per_sec. Jika `journal` (journal.UploadJournal) diisi, baris yang sudah tercatat
+    terkirim dilewati dan setiap batch yang berhasil dicatat ke jurnal. Mengembalikan tuple
+    (failed, rows_done) dengan `failed` daftar (start, end, error) batch yang tetap gagal, urut
+    berdasarkan baris.
+    """
+    failed = []
+    rows_done = 0
+    rows_sent = 0
+    started_at = time.monotonic()
+    pending = {}
+
+    def selesaikan(done):
+        nonlocal rows_done, rows_sent
+        for future in done:
+            start, end, chunk = pending.pop(future)
+            try:
+                error, sent = future.result()
+            except Exception as e:
+                error, sent = str(e), 0
+            if error is None:
+                rows_sent += sent
+                if journal is not None:
+                    journal.catat(start, end)
+            if error is None and table_name == "Industri" and "Nama_Usaha" in chunk.columns:
+                tandai_nama_usaha_terdaftar(chunk["Nama_Usaha"].dropna())
+            rows_done += end - start
+            if error is not None:
+                print(f"❌ Gagal kirim baris {format_rentang_baris(start, end)} ke {tabel_tujuan(table_name)}: {error}")
+                failed.append((start, end, error))
+            if on_progress is not None:
+                elapsed = time.monotonic() - started_at
+                on_progress({
+                    "rows_done": rows_done,
+                    "rows_sent": rows_sent,
+                    "total_rows": total_rows,
+                    "start": start,
+                    "end": end,
+                    "error": error,
+                    "rows_per_sec": rows_done / elapsed if elapsed > 0 else 0.0,
+                })
+
+    max_workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for start, end, chunk in batches:
+            if journal is not None and not chunk.empty:
+                chunk = chunk[~journal.baris_terkirim(chunk.index)]
+            if chunk.empty:
+                rows_done += end - start
+                continue
+            pending[executor.submit(proses_batch, table_name, chunk, mode)] = (start, end, chunk)
+            if len(pending) >= 2 * max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                selesaikan(done)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            selesaikan(done)
+    return sorted(failed), rows_done
+
+
+def kirim_dataframe(table_name, df, batch_size=BATCH_SIZE, max_workers=UPLOAD_WORKERS, on_progress=None, valid=None, mode=MODE_INSERT, journal=None):
+    """Kirim DataFrame yang sudah disiapkan ke Supabase per batch, hanya baris `valid`. Lihat kirim_batches."""
+    failed, _ = kirim_batches(table_name, iter_batches(df, batch_size, valid), len(df), max_workers, on_progress, mode, journal)
+    return failed
+
+
+def kirim_file_streaming(table_name, uploaded_file, tanggal_input, batch_size=BATCH_SIZE, max_workers=UPLOAD_WORKERS, on_progress=None, mode=MODE_INSERT, journal=None):
+    """Baca, konversi, validasi dan kirim file upload per potongan `batch_size` baris.
+
+    Setiap potongan diproses dan dikirim sebelum potongan berikutnya dibaca, sehingga pemakaian
+    memori tetap datar berapa pun ukuran file. Baris yang tidak lolos validasi atau duplikat
+    tidak dikirim. Potongan yang seluruhnya sudah tercatat di `journal` tidak dikonversi maupun
+    divalidasi ulang. Mengembalikan (failed, rows_done, laporan, dup_errors) dengan `laporan`
+    DataFrame Baris/Masalah untuk baris yang ditolak.
+    """
+    laporan_list = []
+    dup_errors = {}
+    seen_names = set()
+
+    def batches():
+        start = 0
+        for chunk in iter_file_chunks(uploaded_file, batch_size):
+            end = start + len(chunk)
+            terkirim = journal.baris_terkirim(range(start, end)) if journal is not None else None
+            if terkirim is not None and terkirim.all():
+                yield start, end, chunk.iloc[0:0]
+                start = end
+                continue
+            chunk, error_mask = siapkan_dataframe(chunk, table_name)
+            valid, laporan = validasi_dataframe(chunk, table_name, error_mask, offset=start)
+            if terkirim is not None:
+                valid &= ~terkirim
+            valid, laporan_dup, errors = cek_duplikat(chunk, table_name, valid, offset=start, seen=seen_names, mode=mode)
+            laporan_list.extend(lap for lap in (laporan, laporan_dup) if not lap.empty)
+            dup_errors.update({(start, key): error for key, error in errors.items()})
+            yield start, end, siapkan_untuk_kirim(chunk[valid.to_numpy()], tanggal_input)
+            start = end
+
+    failed, rows_done = kirim_batches(table_name, batches(), perkiraan_jumlah_baris(uploaded_file), max_workers, on_progress, mode, journal)
+    laporan = gabung_laporan(laporan_list)
+    return failed, rows_done, laporan, dup_errors
+
+
+def proses_upload(table_name, tanggal_input, batch_size=BATCH_SIZE, mode=MODE_INSERT, journal=None,
+                  uploaded_file=None, prepared=None, on_progress=None):
+    """Jalankan satu upload massal sampai selesai, dipakai sebagai job latar belakang (lihat jobs.py).
+
+    `table_name` adalah hasil tentukan_tabel (None jika tidak ada template yang cocok): dipakai
+    untuk konversi dan validasi, sedangkan request dikirim ke tabel_tujuan(table_name). Isi
+    `uploaded_file` untuk mode streaming, atau `prepared` (hasil baca_dan_siapkan) untuk file
+    yang sudah dimuat utuh. Mengembalikan dict berisi mode, failed, total_rows, rows_sent,
+    rows_skipped (sudah terkirim menurut jurnal), laporan dan dup_errors.
+    """
+    rows_skipped = journal.jumlah_terkirim() if journal is not None else 0
+    rows_sent = 0
+
+    def progress(info):
+        nonlocal rows_sent
+        rows_sent = info["rows_sent"]
+        if on_progress is not None:
+            on_progress(info)
+
+    if prepared is None:
+        failed, total_rows, laporan, dup_errors = kirim_file_streaming(
+            table_name, uploaded_file, tanggal_input, batch_size, UPLOAD_WORKERS, progress, mode, journal
+        )
+    else:
+        df = prepared["df"]
+        valid = prepared["valid"]
+        if journal is not None:
+            valid = valid & ~journal.baris_terkirim(df.index)
+        # Cek duplikat Nama_Usaha (di dalam file dan di database) dengan beberapa request in.(...)
+        valid, laporan_dup, dup_errors = cek_duplikat(df, table_name, valid, mode=mode)
+        laporan = gabung_laporan([prepared["laporan"], laporan_dup])
+        df_kirim = siapkan_untuk_kirim(df, tanggal_input)
+        total_rows = len(df_kirim)
+        failed = kirim_dataframe(table_name, df_kirim, batch_size, UPLOAD_WORKERS, progress, valid, mode, journal)
+    return {
+        "mode": mode,
+        "failed": failed,
+        "total_rows": total_rows,
+        "rows_sent": rows_sent,
+        "rows_skipped": rows_skipped,
+        "laporan": laporan,
+        "dup_errors": dup_errors,
+    }
+
+
+def gabung_laporan(laporan_list):
+    laporan_list = [laporan for laporan in laporan_list if not laporan.empty]
+    if not laporan_list:
+        return pd.DataFrame(columns=["Baris", "Masalah"])
+    return pd.concat(laporan_list, ignore_index=True).sort_values("Baris", kind="stable", ignore_index=True)
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU dengan masa berlaku (TTL) per entri, aman dipakai lintas thread/sesi Streamlit.
+
+    Entri yang lewat `ttl` detik dianggap tidak ada; jika jumlah entri melebihi `maxsize`,
+    entri yang paling lama tidak dipakai dibuang lebih dulu. Jika `weigher` diisi, total
+    bobot entri (misalnya ukuran byte) juga dibatasi `maxweight`.
+    """
+
+    def __init__(self, maxsize=256, ttl=300, maxweight=None, weigher=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxweight = maxweight
+        self.weigher = weigher
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at, _ = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        weight = self.weigher(value) if self.weigher is not None else 0
+        with self._lock:
+            self._remove(key)
+            if self.maxweight is not None and weight > self.maxweight:
+                return
+            self._data[key] = (value, expires_at, weight)
+            self.weight += weight
+            while len(self._data) > self.maxsize or (self.maxweight is not None and self.weight > self.maxweight):
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[2]
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "weight": self.weight,
+                "maxweight": self.maxweight,
+            }
@@ -0,0 +1,56 @@
+import io
+
+from PIL import Image, ImageOps
+
+# Sisi terpanjang gambar yang disimpan; foto yang lebih besar diperkecil
+IMAGE_MAX_DIMENSION = 1920
+IMAGE_QUALITY = 82
+# Sisi terpanjang thumbnail yang disimpan di samping gambar utama
+THUMBNAIL_DIMENSION = 320
+THUMBNAIL_QUALITY = 75
+
+
+def _punya_transparansi(image):
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _encode(image, quality):
+    """Encode ulang tanpa metadata EXIF: JPEG untuk gambar biasa, PNG jika ada transparansi."""
+    buffer = io.BytesIO()
+    if _punya_transparansi(image):
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "image/png", "png"
+    image.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue(), "image/jpeg", "jpg"
+
+
+def proses_gambar(file, max_dimension=IMAGE_MAX_DIMENSION, quality=IMAGE_QUALITY,
+                  thumbnail_dimension=THUMBNAIL_DIMENSION, thumbnail_quality=THUMBNAIL_QUALITY):
+    """Perkecil, encode ulang dan buang EXIF gambar sebelum diupload, sekaligus buat thumbnail.
+
+    Orientasi dari EXIF diterapkan dulu ke piksel (foto HP tetap tegak), lalu seluruh metadata
+    (termasuk lokasi GPS) dibuang. Mengembalikan dict berisi data, content_type, ext dan thumbnail
+    (dict data/content_type/ext). `file` adalah file-like (mis. UploadedFile Streamlit) yang dibaca
+    langsung tanpa disalin. ValueError jika isinya bukan gambar yang bisa dibaca.
+    """
+    try:
+        file.seek(0)
+        image = Image.open(file)
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"File bukan gambar yang valid: {e}")
+
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    data, content_type, ext = _encode(image, quality)
+
+    thumb = image.copy()
+    thumb.thumbnail((thumbnail_dimension, thumbnail_dimension), Image.LANCZOS)
+    thumb_data, thumb_type, thumb_ext = _encode(thumb, thumbnail_quality)
+
+    return {
+        "data": data,
+        "content_type": content_type,
+        "ext": ext,
+        "thumbnail": {"data": thumb_data, "content_type": thumb_type, "ext": thumb_ext},
+    }
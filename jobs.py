@@ -0,0 +1,110 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import TTLCache
+
+# Jumlah job latar belakang yang berjalan bersamaan untuk seluruh pengguna (job lain menunggu antrian)
+JOB_WORKERS = 4
+# Job yang sudah selesai tetap bisa dilihat hasilnya selama JOB_TTL detik
+JOB_TTL = 6 * 3600
+JOB_REGISTRY_SIZE = 256
+
+# Status job
+ANTRI = "antri"
+BERJALAN = "berjalan"
+SELESAI = "selesai"
+GAGAL = "gagal"
+
+_executor = None
+_executor_lock = threading.Lock()
+job_registry = TTLCache(JOB_REGISTRY_SIZE, ttl=JOB_TTL)
+
+
+def get_executor():
+    """Worker pool bersama untuk satu proses, di luar thread script Streamlit."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+    return _executor
+
+
+class Job:
+    """Satu pekerjaan latar belakang. Status dan progres dibaca UI lewat snapshot()."""
+
+    def __init__(self, label, owner=None):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.owner = owner
+        self.status = ANTRI
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def set_progress(self, progress):
+        with self._lock:
+            self.progress = progress
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self.status = BERJALAN
+            self.started_at = time.time()
+        try:
+            result = fn(*args, on_progress=self.set_progress, **kwargs)
+        except Exception as e:
+            print(f"❌ Job {self.label} ({self.id}) gagal: {e}\n{traceback.format_exc()}")
+            with self._lock:
+                self.status = GAGAL
+                self.error = str(e)
+                self.finished_at = time.time()
+        else:
+            with self._lock:
+                self.status = SELESAI
+                self.result = result
+                self.finished_at = time.time()
+        # Perpanjang masa simpan agar hasil tetap bisa dilihat setelah job selesai
+        job_registry.set(self.id, self)
+
+    @property
+    def selesai(self):
+        return self.status in (SELESAI, GAGAL)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "label": self.label,
+                "owner": self.owner,
+                "status": self.status,
+                "progress": self.progress,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+def submit_job(label, fn, *args, owner=None, **kwargs):
+    """Jalankan `fn(*args, on_progress=..., **kwargs)` di worker pool dan kembalikan id job.
+
+    `fn` tidak boleh memanggil elemen UI Streamlit; progres dilaporkan lewat `on_progress(dict)`
+    dan hasilnya (nilai kembalian `fn`) disimpan di job untuk ditampilkan pada rerun berikutnya.
+    """
+    job = Job(label, owner)
+    job_registry.set(job.id, job)
+    get_executor().submit(job._run, fn, args, kwargs)
+    return job.id
+
+
+def get_job(job_id):
+    """Job dengan id tersebut, atau None jika tidak ada atau sudah kedaluwarsa."""
+    return job_registry.get(job_id)
@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Lokasi file SQLite jurnal upload (lokal di server Streamlit)
+JOURNAL_PATH = ".upload_journal.sqlite3"
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+@contextmanager
+def _connect(path):
+    # Satu koneksi per operasi: aman dipakai dari thread/sesi mana pun, commit lalu ditutup
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        _init_schema(conn, path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _init_schema(conn, path):
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS journal_upload (
+                        file_hash TEXT NOT NULL,
+                        table_name TEXT NOT NULL,
+                        baris_awal INTEGER NOT NULL,
+                        baris_akhir INTEGER NOT NULL,
+                        committed_at REAL NOT NULL,
+                        PRIMARY KEY (file_hash, table_name, baris_awal, baris_akhir)
+                    )
+                """)
+                conn.commit()
+                _initialized.add(path)
+
+
+def _gabung_rentang(rentang):
+    # Gabungkan rentang [awal, akhir) yang bersinggungan agar pengecekan baris tetap murah
+    hasil = []
+    for awal, akhir in sorted(rentang):
+        if hasil and awal <= hasil[-1][1]:
+            hasil[-1][1] = max(hasil[-1][1], akhir)
+        else:
+            hasil.append([awal, akhir])
+    return [tuple(r) for r in hasil]
+
+
+class UploadJournal:
+    """Jurnal checkpoint upload massal, disimpan di SQLite lokal.
+
+    Setiap batch yang berhasil dikirim dicatat sebagai rentang baris [awal, akhir) dengan kunci
+    hash isi file + tabel tujuan. Jika file yang sama diupload ulang setelah koneksi putus,
+    baris di rentang yang sudah tercatat dilewati sehingga upload lanjut dari batch terakhir
+    yang berhasil, tanpa duplikat dan tanpa baris yang terlewat.
+    """
+
+    def __init__(self, file_hash, table_name, path=JOURNAL_PATH):
+        self.file_hash = file_hash
+        self.table_name = table_name
+        self.path = path
+        self._lock = threading.Lock()
+        with _connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT baris_awal, baris_akhir FROM journal_upload WHERE file_hash = ? AND table_name = ?",
+                (file_hash, table_name)
+            ).fetchall()
+        self.rentang = _gabung_rentang(rows)
+
+    def catat(self, start, end):
+        """Catat rentang baris [start, end) sebagai sudah terkirim."""
+        with self._lock:
+            with _connect(self.path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO journal_upload VALUES (?, ?, ?, ?, ?)",
+                    (self.file_hash, self.table_name, int(start), int(end), time.time())
+                )
+            self.rentang = _gabung_rentang(self.rentang + [(int(start), int(end))])
+
+    def baris_terkirim(self, index):
+        """Mask boolean: True untuk posisi baris (0-based) di `index` yang sudah tercatat terkirim."""
+        posisi = np.asarray(index)
+        mask = np.zeros(len(posisi), dtype=bool)
+        for awal, akhir in self.rentang:
+            mask |= (posisi >= awal) & (posisi < akhir)
+        return mask
+
+    def jumlah_terkirim(self):
+        return sum(akhir - awal for awal, akhir in self.rentang)
+
+    def reset(self):
+        """Hapus catatan untuk file + tabel ini agar upload dimulai lagi dari awal."""
+        with self._lock:
+            with _connect(self.path) as conn:
+                conn.execute(
+                    "DELETE FROM journal_upload WHERE file_hash = ? AND table_name = ?",
+                    (self.file_hash, self.table_name)
+                )
+            self.rentang = []
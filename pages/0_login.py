@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import json
+import supabase_client
 from utils import get_kabupaten_by_email, get_email_from_token
 
 # Set page config harus menjadi perintah Streamlit pertama
@@ -58,16 +59,15 @@ if st.button("Login"):
             
             SUPABASE_URL = st.secrets["SUPABASE_URL"]
             SUPABASE_AUTH = f"{SUPABASE_URL}/auth/v1/token?grant_type=password"
-            API_KEY = st.secrets["SUPABASE_API_KEY"]
 
             headers = {
-                "apikey": API_KEY,
+                **supabase_client.anon_headers(),
                 "Content-Type": "application/json"
             }
             data = {"email": email, "password": password}
 
             try:
-                res = requests.post(SUPABASE_AUTH, headers=headers, data=json.dumps(data))
+                res = supabase_client.post(SUPABASE_AUTH, headers=headers, data=json.dumps(data))
                 print(f"🔍 Autentikasi: Status {res.status_code}, Respon: {res.text}")
 
                 if res.status_code == 200:
@@ -2,11 +2,22 @@ import streamlit as st
 import pandas as pd
 import datetime
 import requests
-import io
-import urllib.parse
-import time
-import simplejson as json
-from utils import get_kabupaten_by_email, get_email_from_token, get_all_kabupaten, get_count_by_kabupaten
+from concurrent.futures import wait
+import supabase_client
+from schema import INDUSTRI_COLUMNS, NATURAL_KEYS
+from journal import UploadJournal
+from validation import validasi_dataframe, validasi_record
+from bulk_upload import (
+    BATCH_SIZE, MODE_INSERT, MODE_UPSERT, PREVIEW_PAGE_ROWS, STREAMING_THRESHOLD_BYTES, baca_dan_siapkan, baca_preview,
+    excel_upload, format_rentang_baris, hash_upload, proses_upload, ringkas_jenis_industri, ringkas_kolom, salin_upload,
+    siapkan_dataframe, tabel_tujuan, template_excel, tentukan_tabel
+)
+from jobs import ANTRI, GAGAL, get_job, submit_job
+from storage import mulai_upload_gambar
+from utils import (
+    cari_nama_usaha_terdaftar, get_all_kabupaten, get_email_from_token, get_kabupaten_by_email, get_progres_kabupaten,
+    invalidate_user_info_cache, tandai_nama_usaha_terdaftar, user_info_cache_stats
+)
 
 # Set page config harus menjadi perintah Streamlit pertama
 st.set_page_config(page_title="Input Data Pariwisata", layout="centered")
@@ -90,15 +101,12 @@ except KeyError as e:
     st.error(f"Missing secret: {e}")
     st.stop()
 
-BUCKET_NAME = "gambar.pariwisata"
-SUPABASE_STORAGE_URL = f"{SUPABASE_URL}/storage/v1/object/public/{BUCKET_NAME}"
-SUPABASE_STORAGE_UPLOAD_URL = f"{SUPABASE_URL}/storage/v1/object"
-SUPABASE_STORAGE_PUBLIC_URL = f"{SUPABASE_URL}/storage/v1/object/public/{BUCKET_NAME}"
+# Interval (detik) pengecekan progres job upload latar belakang
+JOB_POLL_INTERVAL = 1
+# Ukuran maksimum gambar yang diterima form
+MAX_GAMBAR_BYTES = 50 * 1024 * 1024
 
-headers = {
-    "apikey": SUPABASE_API_KEY,
-    "Authorization": f"Bearer {SUPABASE_API_KEY}"
-}
+headers = supabase_client.anon_headers()
 
 # ==============================
 # 🎨 Styling CSS + Responsiveness
@@ -135,16 +143,21 @@ if st.button("Logout"):
     st.switch_page("pages/0_login.py")
 
 # Inisialisasi session state untuk notifikasi dan form
-if 'notification' not in st.session_state:
-    st.session_state.notification = None
+if 'notifications' not in st.session_state:
+    st.session_state.notifications = []
 if 'form_destinasi_reset' not in st.session_state:
     st.session_state.form_destinasi_reset = False
 if 'clear_form_industri' not in st.session_state:
     st.session_state.clear_form_industri = False
 
-# Fungsi untuk menampilkan notifikasi
-def show_notification(type, message, delay=2):
-    st.session_state.notification = {"type": type, "message": message}
+NOTIFICATION_ICONS = {"success": "✅", "error": "❌", "warning": "⚠️", "info": "ℹ️"}
+
+# Fungsi untuk menampilkan notifikasi. Tanpa sleep: notifikasi yang harus tetap terlihat setelah
+# st.rerun() (flash=True) dimasukkan ke antrian session_state dan ditampilkan sebagai toast pada render berikutnya.
+def show_notification(type, message, flash=False):
+    if flash:
+        st.session_state.notifications.append({"type": type, "message": message})
+        return
     if type == "success":
         st.success(message)
     elif type == "error":
@@ -153,8 +166,95 @@ def show_notification(type, message, delay=2):
         st.warning(message)
     elif type == "info":
         st.info(message)
-    time.sleep(delay)  # Berikan waktu untuk pengguna melihat notifikasi
-    st.session_state.notification = None
+
+def tampilkan_antrian_notifikasi():
+    while st.session_state.notifications:
+        notification = st.session_state.notifications.pop(0)
+        st.toast(notification["message"], icon=NOTIFICATION_ICONS.get(notification["type"]))
+
+tampilkan_antrian_notifikasi()
+
+# Fungsi untuk menampilkan laporan validasi upload beserta tombol download-nya
+def tampilkan_laporan_validasi(laporan, judul, key):
+    st.warning(f"⚠️ {judul}")
+    st.dataframe(laporan, use_container_width=True, hide_index=True)
+    st.download_button(
+        label="📥 Download Laporan Validasi (CSV)",
+        data=laporan.to_csv(index=False).encode("utf-8"),
+        file_name="laporan_validasi.csv",
+        mime="text/csv",
+        key=key
+    )
+
+# Tunggu upload gambar latar belakang (storage.mulai_upload_gambar) sambil menampilkan progresnya.
+# Elemen Streamlit hanya diperbarui dari thread script, jadi progres dibaca dari dict bersama.
+def tunggu_upload_gambar(upload):
+    future, progres = upload
+    progress_bar = st.progress(0.0, text="Mengunggah gambar...")
+    while not future.done():
+        wait([future], timeout=0.2)
+        if progres["total"]:
+            progress_bar.progress(
+                min(progres["terkirim"] / progres["total"], 1.0),
+                text=f"Mengunggah gambar... {progres['terkirim'] / 1024 / 1024:.1f}/{progres['total'] / 1024 / 1024:.1f} MB"
+            )
+    progress_bar.empty()
+    return future.result()
+
+# Fungsi untuk menampilkan progres job upload latar belakang
+def tampilkan_progres_upload(job):
+    progress = job["progress"]
+    if progress is None:
+        st.progress(0.0, text=f"⏳ {job['label']}: menunggu giliran..." if job["status"] == ANTRI else f"⏳ {job['label']}: menyiapkan data...")
+        return
+    status = "gagal" if progress["error"] else "berhasil"
+    total_rows = progress["total_rows"]
+    fraction = min(progress["rows_done"] / total_rows, 1.0) if total_rows else 0.0
+    st.progress(
+        fraction,
+        text=(
+            f"Baris {format_rentang_baris(progress['start'], progress['end'])} {status} "
+            f"({progress['rows_done']}/{total_rows or '?'}, {progress['rows_per_sec']:.0f} baris/detik)"
+        )
+    )
+
+# Dipanggil ulang tiap JOB_POLL_INTERVAL detik tanpa menjalankan ulang seluruh halaman
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def pantau_upload(job_id):
+    job = get_job(job_id)
+    if job is None or job.selesai:
+        st.rerun()
+    tampilkan_progres_upload(job.snapshot())
+
+# Fungsi untuk menampilkan hasil job upload yang sudah selesai
+def tampilkan_hasil_upload(job):
+    if job["status"] == GAGAL:
+        show_notification("error", f"Upload gagal: {job['error']}")
+        return
+    result = job["result"]
+    total_rows = result["total_rows"]
+    failed_batches = result["failed"]
+    laporan_validasi = result["laporan"]
+    st.progress(1.0, text=f"Selesai: {total_rows} baris diproses")
+    if result["dup_errors"]:
+        st.warning(f"⚠️ Sebagian Nama_Usaha gagal dicek duplikatnya ke database ({len(result['dup_errors'])} request gagal).")
+
+    rejected_rows = len(laporan_validasi)
+    if not failed_batches and result["mode"] == MODE_UPSERT:
+        unchanged_rows = max(total_rows - rejected_rows - result["rows_sent"] - result["rows_skipped"], 0)
+        show_notification("success", f"{result['rows_sent']} baris baru/berubah berhasil dikirim, {unchanged_rows} baris tidak berubah dilewati.")
+    elif not failed_batches:
+        dilewati = f" ({result['rows_skipped']} baris yang sudah terkirim sebelumnya dilewati)" if result["rows_skipped"] else ""
+        show_notification("success", f"{result['rows_sent']} baris berhasil dikirim ke Supabase!{dilewati}")
+    else:
+        failed_rows = sum(end - start for start, end, _ in failed_batches)
+        show_notification("error", f"{failed_rows} dari {total_rows} baris gagal dikirim.")
+        st.dataframe(pd.DataFrame(
+            [(format_rentang_baris(start, end), error) for start, end, error in failed_batches],
+            columns=["Baris", "Error"]
+        ), use_container_width=True)
+    if rejected_rows:
+        tampilkan_laporan_validasi(laporan_validasi, f"{rejected_rows} baris tidak lolos validasi atau duplikat dan tidak dikirim:", "laporan_validasi_kirim")
 
 # =======================
 # 🚀 TAB NAVIGATION
@@ -219,39 +319,35 @@ with tab1:
         submit_destinasi = st.form_submit_button("Kirim Data")
 
     if submit_destinasi:
-        # Validasi semua kolom wajib, termasuk gambar
-        if not all([nama.strip(), kab_kota.strip(), kecamatan.strip(), kelurahan_desa.strip(), deskripsi.strip(), pengelola, gambar]):
+        # Upload gambar dimulai lebih dulu di latar belakang, bersamaan dengan validasi. Path gambar
+        # berbasis hash isi, jadi jika form ditolak, kirim ulang memakai objek yang sudah terupload.
+        upload_gambar_destinasi = None
+        if gambar and gambar.size <= MAX_GAMBAR_BYTES:
+            upload_gambar_destinasi = mulai_upload_gambar("Destinasi_Wisata", gambar)
+
+        # Validasi semua kolom wajib dengan aturan yang sama seperti upload massal, ditambah gambar
+        masalah = validasi_record({
+            "Nama": nama,
+            "Kab_Kota": kab_kota,
+            "Kecamatan": kecamatan,
+            "Kelurahan_Desa": kelurahan_desa,
+            "Deskripsi": deskripsi,
+            "Pengelola": pengelola,
+            "Rating": rating
+        }, "Destinasi Wisata")
+        if masalah or not gambar:
             show_notification("warning", "Harap isi semua kolom wajib sebelum mengirim, termasuk gambar dan pengelola.")
         else:
             try:
-                if gambar.size > 50 * 1024 * 1024:
+                if gambar.size > MAX_GAMBAR_BYTES:
                     show_notification("warning", "Ukuran file terlalu besar! Maksimum 50MB.")
                 else:
-                    gambar_url = None
-                    file_name = f"{nama.replace(' ', '_')}_{gambar.name}"
-                    file_path = f"Destinasi_Wisata/{file_name}"
-                    upload_url = f"{SUPABASE_STORAGE_UPLOAD_URL}/{BUCKET_NAME}/{file_path}"
-                    
-                    try:
-                        res_upload = requests.post(
-                            upload_url,
-                            data=gambar.getvalue(),
-                            headers={
-                                **headers,
-                                "Content-Type": gambar.type,
-                                "x-upsert": "true"
-                            }
-                        )
-                        if res_upload.status_code in [200, 201]:
-                            encoded_file_path = urllib.parse.quote(file_path)
-                            gambar_url = f"{SUPABASE_STORAGE_PUBLIC_URL}/{encoded_file_path}"
-                            show_notification("info", f"URL Gambar: {gambar_url}")
-                        else:
-                            show_notification("error", f"Gagal upload gambar: {res_upload.text}")
-                            gambar_url = None
-                    except requests.RequestException as e:
-                        show_notification("error", f"Gagal upload gambar: {e}")
-                        gambar_url = None
+                    # Gambar diperkecil, di-encode ulang tanpa EXIF dan diupload bersama thumbnail-nya
+                    gambar_url, upload_error = tunggu_upload_gambar(upload_gambar_destinasi)
+                    if gambar_url:
+                        show_notification("info", f"URL Gambar: {gambar_url}")
+                    else:
+                        show_notification("error", f"Gagal upload gambar: {upload_error}")
 
                     # Jika gambar gagal diunggah, hentikan proses
                     if gambar_url is None:
@@ -271,7 +367,7 @@ with tab1:
                             "Tanggal_Input": datetime.datetime.now().isoformat()
                         }
                         try:
-                            res = requests.post(
+                            res = supabase_client.post(
                                 f"{SUPABASE_URL}/rest/v1/Destinasi%20Wisata",
                                 json=data,
                                 headers={
@@ -281,7 +377,7 @@ with tab1:
                                 }
                             )
                             if res.status_code == 201:
-                                show_notification("success", "Data berhasil dikirim ke Supabase!")
+                                show_notification("success", "Data berhasil dikirim ke Supabase!", flash=True)
                                 st.session_state.form_destinasi_reset = True
                                 st.rerun()
                             else:
@@ -436,145 +532,64 @@ with tab2:
         submit_industri = st.form_submit_button("Kirim Data Industri")
 
     if submit_industri:
-        required_fields = [
-            nama_usaha.strip() if nama_usaha else "",
-            jenis_industri,
-            jenis_kontak,
-            kontak.strip() if kontak else "",
-            kab_kota.strip() if kab_kota else "",
-            kecamatan.strip() if kecamatan else "",
-            kelurahan_desa.strip() if kelurahan_desa else ""
-        ]
-        
-        # Validasi tambahan berdasarkan jenis industri
-        if jenis_industri in ["Hotel", "Wisma", "Villa", "Homestay"]:
-            required_fields.extend([
-                dapur_halal,
-                nib_available,
-                chse,
-                fasilitas.strip() if fasilitas else "",
-                jumlah_kamar,
-                jumlah_bed
-            ])
-            if nib_available == "Ya":
-                required_fields.append(nib.strip() if nib else "")
-        
-        if jenis_industri in ["Restoran", "Rumah Makan"]:
-            required_fields.extend([
-                nib_available,
-                chse,
-                fasilitas.strip() if fasilitas else "",
-                jumlah_kursi
-            ])
-            if nib_available == "Ya":
-                required_fields.append(nib.strip() if nib else "")
-        
-        if jenis_industri == "Spa":
-            required_fields.extend([
-                nib_available,
-                standar_available
-            ])
-            if nib_available == "Ya":
-                required_fields.append(nib.strip() if nib else "")
-            if standar_available == "Ya":
-                required_fields.append(sertifikat_standar.strip() if sertifikat_standar else "")
-        
-        if jenis_industri == "Catering":
-            required_fields.extend([
-                nib_available,
-                trapis_available
-            ])
-            if nib_available == "Ya":
-                required_fields.append(nib.strip() if nib else "")
-            if trapis_available == "Ya":
-                required_fields.append(trapis.strip() if trapis else "")
-        
-        if jenis_industri == "Travel":
-            required_fields.append(nib_available)
-            if nib_available == "Ya":
-                required_fields.append(nib.strip() if nib else "")
-        
-        if jenis_industri == "Usaha Hiburan":
-            required_fields.extend([
-                nib_available,
-                standar_available,
-                jenis_hiburan
-            ])
-            if nib_available == "Ya":
-                required_fields.append(nib.strip() if nib else "")
-            if standar_available == "Ya":
-                required_fields.append(sertifikat_standar.strip() if sertifikat_standar else "")
-
-        if not all(required_fields):
-            show_notification("warning", "Semua kolom wajib diisi. Gambar dan Sertifikat Halal opsional.")
+        data_industri = {
+            "Nama_Usaha": nama_usaha,
+            "Jenis_Industri": jenis_industri,
+            "Karyawan_Pria": jumlah_karyawan_pria,
+            "Karyawan_Wanita": jumlah_karyawan_wanita,
+            "Jumlah_Kamar": jumlah_kamar if jenis_industri in ["Hotel", "Wisma", "Villa", "Homestay"] else None,
+            "Jumlah_Bed": jumlah_bed if jenis_industri in ["Hotel", "Wisma", "Villa", "Homestay"] else None,
+            "Fasilitas": fasilitas if jenis_industri in ["Hotel", "Wisma", "Villa", "Homestay", "Restoran", "Rumah Makan"] else None,
+            "Kab_Kota": kab_kota,
+            "Kecamatan": kecamatan,
+            "Kelurahan_Desa": kelurahan_desa,
+            "Jenis_Kontak": jenis_kontak,
+            "Kontak": kontak,
+            "Bintang_Hotel": bintang_hotel if jenis_industri == "Hotel" else None,
+            "NIB_Available": nib_available == "Ya" if nib_available else None,
+            "NIB": nib if nib_available == "Ya" else None,
+            "CHSE": chse == "Ya" if chse else None,
+            "Dapur_Halal": dapur_halal == "Ya" if dapur_halal else None,
+            "Jumlah_Kursi": jumlah_kursi if jenis_industri in ["Restoran", "Rumah Makan"] else None,
+            "Sertifikat_Halal": sertifikat_halal == "Ya" if sertifikat_halal else None,
+            "Standar_Available": standar_available == "Ya" if standar_available else None,
+            "Sertifikat_Standar": sertifikat_standar if standar_available == "Ya" else None,
+            "Trapis_Available": trapis_available == "Ya" if trapis_available else None,
+            "Trapis": trapis if trapis_available == "Ya" else None,
+            "Jenis_Hiburan": jenis_hiburan if jenis_industri == "Usaha Hiburan" else None
+        }
+
+        # Upload gambar berjalan di latar belakang bersamaan dengan validasi dan cek duplikat,
+        # sehingga waktu submit mendekati request paling lambat, bukan jumlah semuanya
+        upload_gambar_industri = None
+        if gambar_industri and gambar_industri.size <= MAX_GAMBAR_BYTES:
+            upload_gambar_industri = mulai_upload_gambar("Industri", gambar_industri)
+
+        # Validasi kolom wajib per jenis industri dengan aturan yang sama seperti upload massal
+        masalah = validasi_record(data_industri, "Industri")
+        if masalah:
+            show_notification("warning", f"Semua kolom wajib diisi. Gambar dan Sertifikat Halal opsional. ({'; '.join(masalah)})")
         else:
             try:
-                check_industri = requests.get(
-                    f"{SUPABASE_URL}/rest/v1/Industri?Nama_Usaha=eq.{urllib.parse.quote(nama_usaha)}",
-                    headers=headers
-                )
-                if check_industri.status_code == 200 and check_industri.json():
+                # Cek duplikat lewat indeks Nama_Usaha bersama (hanya ke database jika belum diketahui)
+                nama_terdaftar, _ = cari_nama_usaha_terdaftar([nama_usaha])
+                if nama_usaha in nama_terdaftar:
                     show_notification("warning", "Data dengan nama usaha ini sudah ada di database!")
-                elif gambar_industri and gambar_industri.size > 50 * 1024 * 1024:
+                elif gambar_industri and gambar_industri.size > MAX_GAMBAR_BYTES:
                     show_notification("warning", "Ukuran file terlalu besar! Maksimum 50MB.")
                 else:
                     gambar_url = None
-                    if gambar_industri:
-                        file_name = f"{nama_usaha.replace(' ', '_')}_{gambar_industri.name}"
-                        file_path = f"Industri/{file_name}"
-                        upload_url = f"{SUPABASE_STORAGE_UPLOAD_URL}/{BUCKET_NAME}/{file_path}"
-                        
-                        try:
-                            res_upload = requests.post(
-                                upload_url,
-                                data=gambar_industri.getvalue(),
-                                headers={
-                                    **headers,
-                                    "Content-Type": gambar_industri.type,
-                                    "x-upsert": "true"
-                                }
-                            )
-                            if res_upload.status_code in [200, 201]:
-                                encoded_file_path = urllib.parse.quote(file_path)
-                                gambar_url = f"{SUPABASE_STORAGE_PUBLIC_URL}/{encoded_file_path}"
-                                show_notification("info", f"URL Gambar: {gambar_url}")
-                            else:
-                                show_notification("error", f"Gagal upload gambar: {res_upload.text}")
-                                gambar_url = None
-                        except requests.RequestException as e:
-                            show_notification("error", f"Gagal upload gambar: {e}")
-                            gambar_url = None
-
-                    data_industri = {
-                        "Nama_Usaha": nama_usaha,
-                        "Jenis_Industri": jenis_industri,
-                        "Karyawan_Pria": jumlah_karyawan_pria,
-                        "Karyawan_Wanita": jumlah_karyawan_wanita,
-                        "Jumlah_Kamar": jumlah_kamar if jenis_industri in ["Hotel", "Wisma", "Villa", "Homestay"] else None,
-                        "Jumlah_Bed": jumlah_bed if jenis_industri in ["Hotel", "Wisma", "Villa", "Homestay"] else None,
-                        "Fasilitas": fasilitas if jenis_industri in ["Hotel", "Wisma", "Villa", "Homestay", "Restoran", "Rumah Makan"] else None,
-                        "Kab_Kota": kab_kota,
-                        "Kecamatan": kecamatan,
-                        "Kelurahan_Desa": kelurahan_desa,
-                        "Jenis_Kontak": jenis_kontak,
-                        "Kontak": kontak,
-                        "Gambar_URL": gambar_url,
-                        "Bintang_Hotel": bintang_hotel if jenis_industri == "Hotel" else None,
-                        "NIB_Available": nib_available == "Ya" if nib_available else None,
-                        "NIB": nib if nib_available == "Ya" else None,
-                        "CHSE": chse == "Ya" if chse else None,
-                        "Dapur_Halal": dapur_halal == "Ya" if dapur_halal else None,
-                        "Jumlah_Kursi": jumlah_kursi if jenis_industri in ["Restoran", "Rumah Makan"] else None,
-                        "Sertifikat_Halal": sertifikat_halal == "Ya" if sertifikat_halal else None,
-                        "Standar_Available": standar_available == "Ya" if standar_available else None,
-                        "Sertifikat_Standar": sertifikat_standar if standar_available == "Ya" else None,
-                        "Trapis_Available": trapis_available == "Ya" if trapis_available else None,
-                        "Trapis": trapis if trapis_available == "Ya" else None,
-                        "Jenis_Hiburan": jenis_hiburan if jenis_industri == "Usaha Hiburan" else None,
-                        "Tanggal_Input": datetime.datetime.now().isoformat()
-                    }
+                    if upload_gambar_industri:
+                        gambar_url, upload_error = tunggu_upload_gambar(upload_gambar_industri)
+                        if gambar_url:
+                            show_notification("info", f"URL Gambar: {gambar_url}")
+                        else:
+                            show_notification("error", f"Gagal upload gambar: {upload_error}")
+
+                    data_industri["Gambar_URL"] = gambar_url
+                    data_industri["Tanggal_Input"] = datetime.datetime.now().isoformat()
                     try:
-                        res = requests.post(
+                        res = supabase_client.post(
                             f"{SUPABASE_URL}/rest/v1/Industri",
                             json=data_industri,
                             headers={
@@ -584,7 +599,8 @@ with tab2:
                             }
                         )
                         if res.status_code == 201:
-                            show_notification("success", "Data industri berhasil dikirim ke Supabase!")
+                            tandai_nama_usaha_terdaftar([nama_usaha])
+                            show_notification("success", "Data industri berhasil dikirim ke Supabase!", flash=True)
                             st.session_state.clear_form_industri = True
                             st.rerun()
                         else:
@@ -606,117 +622,141 @@ with tab3:
 
     if uploaded_file:
         try:
-            if uploaded_file.name.endswith(".csv"):
-                df = pd.read_csv(uploaded_file, encoding="utf-8", errors="replace")
+            # File besar dibaca per potongan agar tidak perlu dimuat seluruhnya ke memori
+            streaming = st.checkbox(
+                "Mode streaming (untuk file besar, preview hanya baris awal)",
+                value=uploaded_file.size > STREAMING_THRESHOLD_BYTES
+            )
+            if streaming:
+                file_hash = hash_upload(uploaded_file)
+                df = baca_preview(uploaded_file)
+                # Tentukan tabel tujuan berdasarkan kolom
+                table_name, jenis_data = tentukan_tabel(df.columns)
+                df, coercion_errors = siapkan_dataframe(df, table_name)
+                _, laporan_validasi = validasi_dataframe(df, table_name, coercion_errors)
             else:
-                df = pd.read_excel(uploaded_file, engine="openpyxl")
-
-            # Konversi kolom boolean
-            boolean_columns = ["NIB_Available", "Trapis_Available", "CHSE", "Dapur_Halal", "Sertifikat_Halal", "Standar_Available"]
-            for col in boolean_columns:
-                if col in df.columns:
-                    df[col] = df[col].apply(lambda x: True if str(x).lower() in ["true", "1", "ya"] else False if str(x).lower() in ["false", "0", "tidak"] else None)
-
-            # Konversi kolom NIB, Sertifikat_Standar, Trapis ke string
-            for col in ["NIB", "Sertifikat_Standar", "Trapis"]:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).replace("nan", None)
-
-            st.write("📄 Preview Data:")
-            st.dataframe(df)
-
-            # Tentukan tabel tujuan berdasarkan kolom
-            destinasi_columns = set(["Nama", "Kab_Kota", "Kecamatan", "Kelurahan_Desa", "Deskripsi", "Fasilitas_Umum", "Jarak_Ibukota", "Pengelola", "Rating"])
-            industri_columns = set([
-                "Nama_Usaha", "Jenis_Industri", "Kab_Kota", "Kecamatan", "Kelurahan_Desa",
-                "Karyawan_Pria", "Karyawan_Wanita", "Bintang_Hotel", "Jumlah_Kamar", "Jumlah_Bed",
-                "Fasilitas", "Jenis_Kontak", "Kontak", "NIB_Available", "NIB", "CHSE",
-                "Dapur_Halal", "Jumlah_Kursi", "Sertifikat_Halal", "Standar_Available",
-                "Sertifikat_Standar", "Trapis_Available", "Trapis", "Jenis_Hiburan"
-            ])
-            uploaded_columns = set(df.columns)
-
-            if destinasi_columns.issubset(uploaded_columns):
-                table_name = "Destinasi Wisata"
-                jenis_data = "Destinasi"
-            elif industri_columns.issubset(uploaded_columns):
-                table_name = "Industri"
-                jenis_data = "Industri"
+                # Hasil parse, konversi dan validasi di-cache berdasarkan hash isi file, dipakai ulang saat rerun
+                prepared = baca_dan_siapkan(uploaded_file)
+                file_hash = prepared["file_hash"]
+                df = prepared["df"]
+                table_name = prepared["table_name"]
+                jenis_data = prepared["jenis_data"]
+                laporan_validasi = prepared["laporan"]
+
+            if streaming:
+                st.write(f"📄 Preview {len(df)} Baris Pertama:")
+                st.dataframe(df)
+                ringkasan = ringkas_kolom(df, coercion_errors)
+                jenis_industri = ringkas_jenis_industri(df)
             else:
-                table_name = None
-                jenis_data = None
-                show_notification("warning", "Kolom file tidak sesuai dengan template Destinasi atau Industri. Data akan dikirim tanpa validasi.")
-
-            if st.button(f"Kirim Data ke Database"):
-                df["Tanggal_Input"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                if table_name == "Industri":
-                    if "Karyawan_Pria" in df.columns:
-                        df["Karyawan_Pria"] = df["Karyawan_Pria"].astype("Int64", errors="ignore")
-                    if "Karyawan_Wanita" in df.columns:
-                        df["Karyawan_Wanita"] = df["Karyawan_Wanita"].astype("Int64", errors="ignore")
-                    if "Jumlah_Kamar" in df.columns:
-                        df["Jumlah_Kamar"] = df["Jumlah_Kamar"].astype("Int64", errors="ignore")
-                    if "Jumlah_Bed" in df.columns:
-                        df["Jumlah_Bed"] = df["Jumlah_Bed"].astype("Int64", errors="ignore")
-                    if "Bintang_Hotel" in df.columns:
-                        df["Bintang_Hotel"] = df["Bintang_Hotel"].astype("Int64", errors="ignore")
-                    if "Jumlah_Kursi" in df.columns:
-                        df["Jumlah_Kursi"] = df["Jumlah_Kursi"].astype("Int64", errors="ignore")
-
-                df = df.where(pd.notnull(df), None)  # Replace NaN with None
-                data = df.to_dict(orient="records")
-
-                try:
-                    table_name = table_name or "Destinasi Wisata"  # Default to Destinasi if not identified
-                    res = requests.post(
-                        f"{SUPABASE_URL}/rest/v1/{table_name}",
-                        data=json.dumps(data, ignore_nan=True),
-                        headers={
-                            "apikey": SUPABASE_API_KEY,
-                            "Authorization": f"Bearer {SUPABASE_API_KEY}",
-                            "Content-Type": "application/json",
-                            "Prefer": "return=representation"
-                        }
+                # Hanya satu halaman/potongan yang dikirim ke browser; statistik dihitung sekali per file
+                ringkasan = prepared["ringkasan"]
+                jenis_industri = prepared["jenis_industri"]
+                st.write(f"📄 Preview Data ({len(df)} baris):")
+                tampilan = st.radio("Tampilan preview", ["Per halaman", "Awal", "Akhir", "Sampel acak"], horizontal=True)
+                if tampilan == "Per halaman":
+                    jumlah_halaman = max((len(df) - 1) // PREVIEW_PAGE_ROWS + 1, 1)
+                    halaman = st.number_input(f"Halaman (dari {jumlah_halaman})", min_value=1, max_value=jumlah_halaman, value=1, step=1)
+                    mulai = (int(halaman) - 1) * PREVIEW_PAGE_ROWS
+                    st.dataframe(df.iloc[mulai:mulai + PREVIEW_PAGE_ROWS])
+                elif tampilan == "Awal":
+                    st.dataframe(df.head(PREVIEW_PAGE_ROWS))
+                elif tampilan == "Akhir":
+                    st.dataframe(df.tail(PREVIEW_PAGE_ROWS))
+                else:
+                    st.dataframe(df.loc[prepared["sampel"]])
+
+            with st.expander("📊 Ringkasan Kolom" + (" (dari preview)" if streaming else "")):
+                st.dataframe(ringkasan, use_container_width=True, hide_index=True)
+                if jenis_industri is not None:
+                    st.dataframe(jenis_industri, use_container_width=True, hide_index=True)
+
+            if table_name is None:
+                show_notification("warning", "Kolom file tidak sesuai dengan template Destinasi atau Industri. Data akan dikirim tanpa validasi kolom wajib.")
+
+            if not laporan_validasi.empty:
+                keterangan = "di preview" if streaming else "dari file ini"
+                tampilkan_laporan_validasi(laporan_validasi, f"{len(laporan_validasi)} baris {keterangan} tidak lolos validasi dan tidak akan dikirim:", "laporan_validasi_preview")
+
+            batch_size = st.number_input("Jumlah baris per batch", min_value=1, max_value=5000, value=BATCH_SIZE, step=100)
+
+            # Upsert hanya tersedia untuk tabel yang punya kunci alami (lihat sql/kunci_alami_upsert.sql)
+            mode = MODE_INSERT
+            if table_name in NATURAL_KEYS:
+                mode_label = st.radio(
+                    "Mode kirim",
+                    ["Tambah data baru", "Perbarui data yang sudah ada (upsert)"],
+                    horizontal=True,
+                    help=f"Upsert mencocokkan baris berdasarkan {' + '.join(NATURAL_KEYS[table_name])}; baris yang isinya tidak berubah tidak dikirim ulang."
+                )
+                if mode_label != "Tambah data baru":
+                    mode = MODE_UPSERT
+
+            # File tanpa template yang cocok tetap dikonversi/divalidasi dengan table_name None, hanya tujuannya default
+            target_table = tabel_tujuan(table_name)
+
+            # Jurnal checkpoint: batch yang sudah berhasil terkirim dari file yang sama dilewati saat upload ulang
+            journal = UploadJournal(file_hash, target_table)
+            mulai_ulang = False
+            if journal.jumlah_terkirim():
+                st.info(f"♻️ {journal.jumlah_terkirim()} baris dari file ini sudah pernah terkirim ke {target_table}. Upload akan dilanjutkan dari batch berikutnya.")
+                mulai_ulang = st.checkbox("Kirim ulang dari awal (abaikan catatan upload sebelumnya)")
+
+            upload_berjalan = bool(st.session_state.get("upload_job_id"))
+            if st.button(f"Kirim Data ke Database", disabled=upload_berjalan):
+                tanggal_input = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                if mulai_ulang:
+                    journal.reset()
+                # Upload dijalankan di worker pool latar belakang agar tidak terputus oleh rerun
+                st.session_state["upload_job_id"] = submit_job(
+                    f"Upload {uploaded_file.name} ke {target_table}",
+                    proses_upload,
+                    table_name,
+                    tanggal_input,
+                    int(batch_size),
+                    mode,
+                    journal,
+                    uploaded_file=salin_upload(uploaded_file) if streaming else None,
+                    prepared=None if streaming else prepared,
+                    owner=st.session_state['user_email'],
+                )
+
+            # Download ulang file sebagai Excel (mode streaming tidak memuat seluruh data)
+            if not streaming:
+                # Workbook baru dibuat saat diminta, lalu di-cache berdasarkan hash file
+                excel_bytes = excel_upload(file_hash)
+                if excel_bytes is None and st.button("📄 Siapkan File Excel untuk Download Ulang"):
+                    with st.spinner("Membuat file Excel..."):
+                        excel_bytes = excel_upload(file_hash, df)
+                if excel_bytes is not None:
+                    st.download_button(
+                        label="📥 Download Ulang File (Excel)",
+                        data=excel_bytes,
+                        file_name="data_upload.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
-                    if res.status_code == 201:
-                        show_notification("success", "Data berhasil dikirim ke Supabase!")
-                    else:
-                        error_message = res.json().get("message", res.text) if res.text else "Unknown error"
-                        show_notification("error", f"Gagal kirim data: {res.status_code} - {error_message}")
-                except requests.RequestException as e:
-                    show_notification("error", f"Gagal kirim data ke Supabase: {str(e)}")
-
-            # Download ulang file sebagai Excel
-            towrite = io.BytesIO()
-            df.to_excel(towrite, index=False, engine='openpyxl')
-            towrite.seek(0)
-            st.download_button(
-                label="📥 Download Ulang File (Excel)",
-                data=towrite,
-                file_name="data_upload.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
 
         except UnicodeDecodeError:
             show_notification("error", "Gagal membaca file CSV: Encoding tidak didukung. Harap gunakan encoding UTF-8.")
         except Exception as e:
             show_notification("error", f"Terjadi kesalahan saat membaca file: {str(e)}")
 
+    # Progres dan hasil job upload latar belakang milik sesi ini
+    upload_job_id = st.session_state.get("upload_job_id")
+    if upload_job_id:
+        upload_job = get_job(upload_job_id)
+        if upload_job is None:
+            st.session_state.pop("upload_job_id", None)
+        elif not upload_job.selesai:
+            pantau_upload(upload_job_id)
+        else:
+            st.session_state.pop("upload_job_id", None)
+            tampilkan_hasil_upload(upload_job.snapshot())
+
     st.markdown("💾 Belum punya template? Silakan download:")
-    industri_template = pd.DataFrame(columns=[
-        "Nama_Usaha", "Jenis_Industri", "Kab_Kota", "Kecamatan", "Kelurahan_Desa",
-        "Karyawan_Pria", "Karyawan_Wanita", "Bintang_Hotel", "Jumlah_Kamar", "Jumlah_Bed",
-        "Fasilitas", "Jenis_Kontak", "Kontak", "NIB_Available", "NIB", "CHSE",
-        "Dapur_Halal", "Jumlah_Kursi", "Sertifikat_Halal", "Standar_Available",
-        "Sertifikat_Standar", "Trapis_Available", "Trapis", "Jenis_Hiburan"
-    ])
-    buffer_industri = io.BytesIO()
-    industri_template.to_excel(buffer_industri, index=False, engine='openpyxl')
-    buffer_industri.seek(0)
     st.download_button(
         label="🏨 Template Industri (Excel)",
-        data=buffer_industri,
+        data=template_excel(tuple(INDUSTRI_COLUMNS)),
         file_name="template_industri.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -724,78 +764,68 @@ with tab3:
 # =======================
 # 📈 PROGRES UPLOAD DATA (Hanya untuk Admin)
 # =======================
-if is_admin:
-    with tab4:
-        st.subheader("📈 Progres Upload Data per Kabupaten/Kota")
+# Dashboard dihitung hanya saat dibuka atau dimuat ulang, lalu disimpan di session_state.
+# Fragment membuat klik tombol di sini hanya menjalankan ulang bagian ini, dan rerun dari tab lain
+# (misalnya mengetik di form) tidak memicu request ke Supabase.
+def hitung_progres_admin():
+    kabupaten_list = get_all_kabupaten()
+    if not kabupaten_list:
+        return None
+
+    # Hitung jumlah data per kabupaten dalam satu request (RPC), dengan fallback paralel per kabupaten
+    destinasi_counts, industri_counts, count_errors = get_progres_kabupaten(kabupaten_list)
+    progres_df = pd.DataFrame({
+        "Kabupaten_Kota": kabupaten_list,
+        "Jumlah_Destinasi_Wisata": pd.array([destinasi_counts[kab] for kab in kabupaten_list], dtype="Int64"),
+        "Jumlah_Industri": pd.array([industri_counts[kab] for kab in kabupaten_list], dtype="Int64")
+    })
+    return {
+        "progres_df": progres_df,
+        "gagal": sorted(set(kab for _, kab in count_errors)),
+        "waktu": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
 
-        kabupaten_list = get_all_kabupaten()
-        if not kabupaten_list:
+@st.fragment
+def tampilkan_progres_admin():
+    st.subheader("📈 Progres Upload Data per Kabupaten/Kota")
+
+    progres = st.session_state.get("progres_admin")
+    if progres is None:
+        if not st.button("📊 Tampilkan Progres Upload Data"):
+            return
+    elif st.button("🔄 Muat Ulang Data Progres"):
+        invalidate_user_info_cache()
+        progres = None
+
+    if progres is None:
+        with st.spinner("Menghitung progres upload data..."):
+            progres = hitung_progres_admin()
+        if progres is None:
             st.error("Gagal mengambil daftar kabupaten/kota.")
-            st.stop()
+            return
+        st.session_state["progres_admin"] = progres
 
-        # Normalisasi daftar kabupaten untuk pencocokan
-        normalized_kabupaten_list = [kab.lower().replace("kabupaten ", "").replace("kab. ", "").strip() for kab in kabupaten_list]
+    if progres["gagal"]:
+        st.warning(f"⚠️ Gagal menghitung data untuk {len(progres['gagal'])} kabupaten/kota: {', '.join(progres['gagal'])}")
 
-        # Hitung jumlah data dengan mempertimbangkan variasi penulisan
-        destinasi_counts = {}
-        industri_counts = {}
-        for kab, norm_kab in zip(kabupaten_list, normalized_kabupaten_list):
-            # Gunakan ilike dengan pola *nama_kabupaten*
-            query_destinasi = f"Kab_Kota=ilike.*{urllib.parse.quote(norm_kab)}*"
-            query_industri = f"Kab_Kota=ilike.*{urllib.parse.quote(norm_kab)}*"
+    progres_df = progres["progres_df"]
+    st.write("**Tabel Progres Upload Data**")
+    st.dataframe(progres_df, use_container_width=True)
 
-            try:
-                # Hitung untuk Destinasi Wisata
-                res_destinasi = requests.get(
-                    f"{SUPABASE_URL}/rest/v1/Destinasi%20Wisata?{query_destinasi}&select=count",
-                    headers={
-                        "apikey": SUPABASE_API_KEY,
-                        "Authorization": f"Bearer {SUPABASE_API_KEY}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                if res_destinasi.status_code == 200:
-                    count_data = res_destinasi.json()
-                    destinasi_counts[kab] = count_data[0]["count"] if count_data else 0
-                else:
-                    destinasi_counts[kab] = 0
-
-                # Hitung untuk Industri
-                res_industri = requests.get(
-                    f"{SUPABASE_URL}/rest/v1/Industri?{query_industri}&select=count",
-                    headers={
-                        "apikey": SUPABASE_API_KEY,
-                        "Authorization": f"Bearer {SUPABASE_API_KEY}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                if res_industri.status_code == 200:
-                    count_data = res_industri.json()
-                    industri_counts[kab] = count_data[0]["count"] if count_data else 0
-                else:
-                    industri_counts[kab] = 0
+    total_destinasi = progres_df["Jumlah_Destinasi_Wisata"].sum()
+    total_industri = progres_df["Jumlah_Industri"].sum()
+    total_kabupaten = len(progres_df)
+    kabupaten_with_data = len(progres_df[(progres_df["Jumlah_Destinasi_Wisata"].fillna(0) > 0) | (progres_df["Jumlah_Industri"].fillna(0) > 0)])
+    percentage = (kabupaten_with_data / total_kabupaten * 100) if total_kabupaten > 0 else 0
 
-            except Exception:
-                destinasi_counts[kab] = 0
-                industri_counts[kab] = 0
-
-        progres_data = {
-            "Kabupaten_Kota": kabupaten_list,
-            "Jumlah_Destinasi_Wisata": [destinasi_counts[kab] for kab in kabupaten_list],
-            "Jumlah_Industri": [industri_counts[kab] for kab in kabupaten_list]
-        }
-        progres_df = pd.DataFrame(progres_data)
+    st.write("**Statistik Ringkas**")
+    st.write(f"Total Destinasi Wisata: {total_destinasi}")
+    st.write(f"Total Industri: {total_industri}")
+    st.write(f"Persentase Kabupaten/Kota yang Mengunggah: {percentage:.2f}%")
 
-        st.write("**Tabel Progres Upload Data**")
-        st.dataframe(progres_df, use_container_width=True)
+    cache_stats = user_info_cache_stats()
+    st.caption(f"Dihitung pada {progres['waktu']} · Cache user_info: {cache_stats['hits']} hit, {cache_stats['misses']} miss, {cache_stats['size']}/{cache_stats['maxsize']} entri")
 
-        total_destinasi = progres_df["Jumlah_Destinasi_Wisata"].sum()
-        total_industri = progres_df["Jumlah_Industri"].sum()
-        total_kabupaten = len(kabupaten_list)
-        kabupaten_with_data = len(progres_df[(progres_df["Jumlah_Destinasi_Wisata"] > 0) | (progres_df["Jumlah_Industri"] > 0)])
-        percentage = (kabupaten_with_data / total_kabupaten * 100) if total_kabupaten > 0 else 0
-
-        st.write("**Statistik Ringkas**")
-        st.write(f"Total Destinasi Wisata: {total_destinasi}")
-        st.write(f"Total Industri: {total_industri}")
-        st.write(f"Persentase Kabupaten/Kota yang Mengunggah: {percentage:.2f}%")
\ No newline at end of file
+if is_admin:
+    with tab4:
+        tampilkan_progres_admin()
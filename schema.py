@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_numeric_dtype
+
+# Tipe kolom yang dikenali skema
+BOOLEAN = "boolean"
+INTEGER = "integer"
+STRING = "string"
+
+# Nilai teks yang diterima untuk kolom boolean (setelah strip + lowercase)
+BOOLEAN_MAP = {"true": True, "1": True, "ya": True, "false": False, "0": False, "tidak": False}
+
+# Skema kolom untuk upload massal; urutan kolom sama dengan template Excel
+TABLE_SCHEMAS = {
+    "Destinasi Wisata": {
+        "Nama": STRING,
+        "Kab_Kota": STRING,
+        "Kecamatan": STRING,
+        "Kelurahan_Desa": STRING,
+        "Deskripsi": STRING,
+        "Fasilitas_Umum": STRING,
+        "Jarak_Ibukota": STRING,
+        "Pengelola": STRING,
+        "Rating": INTEGER,
+    },
+    "Industri": {
+        "Nama_Usaha": STRING,
+        "Jenis_Industri": STRING,
+        "Kab_Kota": STRING,
+        "Kecamatan": STRING,
+        "Kelurahan_Desa": STRING,
+        "Karyawan_Pria": INTEGER,
+        "Karyawan_Wanita": INTEGER,
+        "Bintang_Hotel": INTEGER,
+        "Jumlah_Kamar": INTEGER,
+        "Jumlah_Bed": INTEGER,
+        "Fasilitas": STRING,
+        "Jenis_Kontak": STRING,
+        "Kontak": STRING,
+        "NIB_Available": BOOLEAN,
+        "NIB": STRING,
+        "CHSE": BOOLEAN,
+        "Dapur_Halal": BOOLEAN,
+        "Jumlah_Kursi": INTEGER,
+        "Sertifikat_Halal": BOOLEAN,
+        "Standar_Available": BOOLEAN,
+        "Sertifikat_Standar": STRING,
+        "Trapis_Available": BOOLEAN,
+        "Trapis": STRING,
+        "Jenis_Hiburan": STRING,
+    },
+}
+
+# Kunci alami untuk mode upsert (harus punya unique constraint, lihat sql/kunci_alami_upsert.sql)
+NATURAL_KEYS = {
+    "Destinasi Wisata": ["Nama", "Kab_Kota"],
+    "Industri": ["Nama_Usaha", "Kab_Kota"],
+}
+
+DESTINASI_COLUMNS = list(TABLE_SCHEMAS["Destinasi Wisata"])
+INDUSTRI_COLUMNS = list(TABLE_SCHEMAS["Industri"])
+# Skema gabungan untuk file yang kolomnya tidak cocok dengan template mana pun
+ALL_COLUMNS_SCHEMA = {**TABLE_SCHEMAS["Destinasi Wisata"], **TABLE_SCHEMAS["Industri"]}
+
+
+def schema_for(table_name):
+    return TABLE_SCHEMAS.get(table_name, ALL_COLUMNS_SCHEMA)
+
+
+def _as_text(series):
+    """Ubah kolom menjadi teks ter-strip; angka bulat dari Excel (mis. 123.0) ditulis tanpa desimal."""
+    if is_float_dtype(series) and not (series.notna() & (series != series.round())).any():
+        series = series.astype("Int64")
+    text = series.astype("string").str.strip()
+    return text.replace("", pd.NA)
+
+
+def _present(series):
+    # Nilai dianggap diisi jika bukan NaN/None dan bukan teks kosong
+    return _as_text(series).notna() if not is_numeric_dtype(series) else series.notna()
+
+
+def coerce_boolean(series):
+    # Kolom boolean hanya berisi sedikit nilai berbeda, jadi teks cukup diolah sekali per nilai unik.
+    # "1.0"/"0.0" dari kolom campuran teks-angka di Excel diperlakukan sama dengan "1"/"0"
+    codes, uniques = pd.factorize(series)
+    text = _as_text(pd.Series(uniques)).str.lower().str.replace(r"\.0$", "", regex=True)
+    mapped = text.map(BOOLEAN_MAP).astype("boolean")
+    # Elemen tambahan False untuk kode -1 (nilai kosong)
+    gagal = np.append((text.notna() & mapped.isna()).to_numpy(dtype=bool), False)
+    result = pd.Series(mapped.array.take(codes, allow_fill=True), index=series.index, name=series.name)
+    return result, pd.Series(gagal[codes], index=series.index, name=series.name)
+
+
+def coerce_integer(series):
+    if is_numeric_dtype(series) and not is_bool_dtype(series):
+        numbers = series.astype("Float64")
+    else:
+        numbers = pd.to_numeric(_as_text(series), errors="coerce").astype("Float64")
+    integral = numbers.notna() & (numbers == numbers.round())
+    result = numbers.where(integral).astype("Int64")
+    return result, _present(series) & result.isna()
+
+
+def coerce_string(series):
+    result = _as_text(series)
+    return result, pd.Series(False, index=series.index)
+
+
+COERCERS = {BOOLEAN: coerce_boolean, INTEGER: coerce_integer, STRING: coerce_string}
+
+
+def coerce_dataframe(df, table_name):
+    """Konversi kolom DataFrame sesuai skema tabel secara tervektorisasi.
+
+    Kolom boolean dipetakan dengan BOOLEAN_MAP ke dtype `boolean`, kolom angka menjadi `Int64`
+    dan kolom teks menjadi `string` yang sudah di-strip. Kolom yang tidak ada di skema dibiarkan.
+    Mengembalikan (df, error_mask): `error_mask` adalah DataFrame boolean per kolom yang bernilai
+    True untuk sel yang diisi tetapi tidak bisa dikonversi (nilainya menjadi kosong di `df`).
+    """
+    errors = {}
+    for col, col_type in schema_for(table_name).items():
+        if col in df.columns:
+            df[col], errors[col] = COERCERS[col_type](df[col])
+    error_mask = pd.DataFrame(errors, index=df.index)
+    return df, error_mask
+
@@ -0,0 +1,16 @@
+-- Hitung jumlah data Destinasi Wisata dan Industri per kabupaten/kota dalam satu panggilan.
+-- Dipakai oleh utils.get_progres_kabupaten lewat POST /rest/v1/rpc/hitung_progres_kabupaten.
+-- Pencocokan sama dengan versi lama: Kab_Kota ilike '%<nama kabupaten ternormalisasi>%'.
+create or replace function public.hitung_progres_kabupaten(kabupaten_list text[], pola_list text[])
+returns table (kabupaten text, jumlah_destinasi bigint, jumlah_industri bigint)
+language sql
+stable
+as $$
+    select
+        k.kabupaten,
+        (select count(*) from public."Destinasi Wisata" d where d."Kab_Kota" ilike '%' || k.pola || '%'),
+        (select count(*) from public."Industri" i where i."Kab_Kota" ilike '%' || k.pola || '%')
+    from unnest(kabupaten_list, pola_list) as k(kabupaten, pola);
+$$;
+
+grant execute on function public.hitung_progres_kabupaten(text[], text[]) to anon, authenticated;
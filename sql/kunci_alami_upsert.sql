@@ -0,0 +1,8 @@
+-- Unique constraint untuk mode upsert upload massal (on_conflict + resolution=merge-duplicates).
+-- Kolomnya harus sama dengan schema.NATURAL_KEYS. Hapus dulu baris duplikat yang sudah ada
+-- sebelum menjalankan skrip ini, karena constraint akan gagal dibuat jika masih ada duplikat.
+alter table public."Industri"
+    add constraint industri_nama_usaha_kab_kota_key unique ("Nama_Usaha", "Kab_Kota");
+
+alter table public."Destinasi Wisata"
+    add constraint destinasi_wisata_nama_kab_kota_key unique ("Nama", "Kab_Kota");
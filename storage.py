@@ -0,0 +1,235 @@
+import base64
+import hashlib
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import supabase_client
+from cache import TTLCache
+from images import proses_gambar
+
+BUCKET_NAME = "gambar.pariwisata"
+# Ekstensi yang mungkin dihasilkan images.proses_gambar, dicek berurutan saat mencari objek lama
+IMAGE_EXTENSIONS = ("jpg", "png")
+# Path berbasis hash isi tidak pernah berubah isinya, jadi indeks lokal boleh disimpan lama
+GAMBAR_INDEX_TTL = 24 * 3600
+
+# Upload resumable (TUS) untuk objek besar; Supabase mewajibkan chunk tepat 6 MB kecuali chunk terakhir
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+TUS_THRESHOLD = TUS_CHUNK_SIZE
+TUS_CHUNK_RETRIES = 3
+
+# Jumlah upload gambar form yang berjalan bersamaan di latar belakang (terpisah dari job upload massal)
+UPLOAD_GAMBAR_WORKERS = 8
+
+# (folder, sha256 isi file asli) -> path objek yang sudah ada di bucket
+gambar_index = TTLCache(10000, ttl=GAMBAR_INDEX_TTL)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_upload_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=UPLOAD_GAMBAR_WORKERS, thread_name_prefix="gambar")
+    return _executor
+
+
+def storage_upload_url(path):
+    return f"{supabase_client.supabase_url()}/storage/v1/object/{BUCKET_NAME}/{urllib.parse.quote(path)}"
+
+
+def storage_public_url(path):
+    return f"{supabase_client.supabase_url()}/storage/v1/object/public/{BUCKET_NAME}/{urllib.parse.quote(path)}"
+
+
+def storage_resumable_url():
+    return f"{supabase_client.supabase_url()}/storage/v1/upload/resumable"
+
+
+def hash_gambar(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def objek_ada(path):
+    """Cek apakah objek publik sudah ada di bucket dengan HEAD. Error jaringan dianggap tidak ada."""
+    try:
+        res = supabase_client.head(storage_public_url(path))
+    except requests.RequestException as e:
+        print(f"⚠️ Gagal cek objek {path}: {e}")
+        return False
+    return res.status_code == 200
+
+
+def _sudah_ada(res):
+    # Storage menolak x-upsert: false untuk path yang sudah terisi (409, atau 400 berisi statusCode 409)
+    return res.status_code == 409 or (res.status_code == 400 and ("409" in res.text or "Duplicate" in res.text))
+
+
+def _tus_metadata(path, content_type):
+    metadata = {"bucketName": BUCKET_NAME, "objectName": path, "contentType": content_type, "cacheControl": "3600"}
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items())
+
+
+def _tus_headers(**extra):
+    return {**supabase_client.anon_headers(), "Tus-Resumable": "1.0.0", **extra}
+
+
+def _tus_offset(location, fallback):
+    # Offset yang benar-benar sudah diterima server, untuk melanjutkan setelah chunk gagal
+    try:
+        res = supabase_client.head(location, headers=_tus_headers())
+        return int(res.headers["Upload-Offset"])
+    except (requests.RequestException, KeyError, ValueError):
+        return fallback
+
+
+def upload_object_resumable(path, data, content_type, on_progress=None):
+    """Upload objek besar dengan protokol TUS per chunk TUS_CHUNK_SIZE, tanpa menimpa objek lama.
+
+    `data` dibaca lewat memoryview, jadi hanya satu chunk yang disalin setiap kali kirim. Chunk
+    yang gagal diulang dari offset terakhir yang diterima server. `on_progress(terkirim, total)`
+    dipanggil setelah tiap chunk. Mengembalikan pesan error, atau None jika berhasil.
+    """
+    view = memoryview(data)
+    total = len(view)
+    try:
+        res = supabase_client.post(
+            storage_resumable_url(),
+            headers=_tus_headers(**{
+                "Upload-Length": str(total),
+                "Upload-Metadata": _tus_metadata(path, content_type),
+                "x-upsert": "false"
+            })
+        )
+    except requests.RequestException as e:
+        return str(e)
+    if _sudah_ada(res):
+        return None
+    if res.status_code != 201 or "Location" not in res.headers:
+        return res.text or f"HTTP {res.status_code}"
+    location = res.headers["Location"]
+
+    offset = 0
+    attempt = 0
+    while offset < total:
+        try:
+            res = supabase_client.patch(
+                location,
+                data=bytes(view[offset:offset + TUS_CHUNK_SIZE]),
+                headers=_tus_headers(**{
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream"
+                })
+            )
+            if res.status_code == 204:
+                offset = int(res.headers.get("Upload-Offset", offset + min(TUS_CHUNK_SIZE, total - offset)))
+                attempt = 0
+                if on_progress is not None:
+                    on_progress(offset, total)
+                continue
+            error = res.text or f"HTTP {res.status_code}"
+        except requests.RequestException as e:
+            error = str(e)
+        attempt += 1
+        if attempt > TUS_CHUNK_RETRIES:
+            return error
+        print(f"🔁 Lanjutkan upload {path} dari byte {offset} (percobaan ke-{attempt + 1}): {error}")
+        offset = _tus_offset(location, offset)
+    return None
+
+
+def upload_object(path, data, content_type, on_progress=None):
+    """Upload satu objek ke bucket tanpa menimpa objek lama. Mengembalikan pesan error, atau None jika berhasil.
+
+    Objek di atas TUS_THRESHOLD dikirim per chunk lewat upload_object_resumable. Objek yang ternyata
+    sudah ada dianggap berhasil, karena path berbasis hash isi berarti isinya sama.
+    """
+    if len(data) > TUS_THRESHOLD:
+        return upload_object_resumable(path, data, content_type, on_progress)
+    try:
+        res = supabase_client.post(
+            storage_upload_url(path),
+            data=data,
+            headers={
+                **supabase_client.anon_headers(),
+                "Content-Type": content_type,
+                "x-upsert": "false"
+            }
+        )
+    except requests.RequestException as e:
+        return str(e)
+    if res.status_code in (200, 201) or _sudah_ada(res):
+        if on_progress is not None:
+            on_progress(len(data), len(data))
+        return None
+    return res.text or f"HTTP {res.status_code}"
+
+
+def cari_gambar(folder, content_hash):
+    """Path gambar dengan hash isi `content_hash` yang sudah tersimpan di `folder`, atau None."""
+    key = (folder, content_hash)
+    path = gambar_index.get(key)
+    if path is not None:
+        return path
+    for ext in IMAGE_EXTENSIONS:
+        candidate = f"{folder}/{content_hash}.{ext}"
+        if objek_ada(candidate):
+            gambar_index.set(key, candidate)
+            return candidate
+    return None
+
+
+def upload_gambar(folder, gambar, on_progress=None):
+    """Perkecil dan upload gambar dari form ke `folder` dengan path berbasis SHA-256 isi file.
+
+    Gambar yang isinya sama (dicek di indeks lokal, lalu dengan HEAD ke bucket) tidak diupload
+    ulang dan URL lamanya dipakai kembali; nama berbeda tidak bisa saling menimpa. Thumbnail
+    disimpan di samping gambar utama sebagai `<hash>_thumb`. `on_progress(terkirim, total)` melaporkan
+    byte gambar utama yang sudah terkirim. Mengembalikan tuple (gambar_url, error): URL publik gambar
+    utama, atau None dan pesan error.
+    """
+    # Hash dan decode langsung dari buffer upload, tanpa menyalin seluruh isi file
+    content_hash = hash_gambar(gambar.getbuffer())
+    existing = cari_gambar(folder, content_hash)
+    if existing is not None:
+        print(f"♻️ Gambar {gambar.name} sudah tersimpan sebagai {existing}, upload dilewati")
+        return storage_public_url(existing), None
+
+    try:
+        hasil = proses_gambar(gambar)
+    except ValueError as e:
+        return None, str(e)
+
+    file_path = f"{folder}/{content_hash}.{hasil['ext']}"
+    error = upload_object(file_path, hasil["data"], hasil["content_type"], on_progress)
+    if error is not None:
+        return None, error
+
+    thumbnail = hasil["thumbnail"]
+    thumbnail_path = f"{folder}/{content_hash}_thumb.{thumbnail['ext']}"
+    thumbnail_error = upload_object(thumbnail_path, thumbnail["data"], thumbnail["content_type"])
+    if thumbnail_error is not None:
+        print(f"⚠️ Gagal upload thumbnail {thumbnail_path}: {thumbnail_error}")
+    gambar_index.set((folder, content_hash), file_path)
+    return storage_public_url(file_path), None
+
+
+def mulai_upload_gambar(folder, gambar):
+    """Jalankan upload_gambar di thread latar belakang agar bisa berjalan bersamaan dengan validasi
+    dan cek duplikat. Mengembalikan (future, progres): future berisi hasil (gambar_url, error) dan
+    dict progres {terkirim, total} yang diperbarui selama upload.
+    """
+    progres = {"terkirim": 0, "total": None}
+
+    def on_progress(terkirim, total):
+        progres["terkirim"] = terkirim
+        progres["total"] = total
+
+    future = get_upload_executor().submit(upload_gambar, folder, gambar, on_progress)
+    return future, progres
@@ -0,0 +1,140 @@
+import random
+import threading
+import time
+from functools import lru_cache
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Timeout default (connect, read) dalam detik untuk semua request ke Supabase
+DEFAULT_TIMEOUT = (5, 30)
+# Jumlah host berbeda yang pool-nya disimpan (REST, Auth, Storage berada di host yang sama)
+POOL_CONNECTIONS = 4
+# Jumlah koneksi keep-alive maksimum per host, cukup untuk worker paralel dan banyak pengguna
+POOL_MAXSIZE = 32
+
+# Kebijakan retry bersama: backoff eksponensial dengan jitter, dibatasi deadline total
+RETRY_ATTEMPTS = 4
+RETRY_BACKOFF = 0.25
+RETRY_MAX_BACKOFF = 2.0
+RETRY_DEADLINE = 10
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Untuk POST/PATCH hanya status yang menandakan request belum diproses server yang diulang
+RETRYABLE_STATUS_NON_IDEMPOTENT = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Session requests bersama untuk satu proses, dengan connection pool dan keep-alive."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def supabase_url():
+    return st.secrets["SUPABASE_URL"]
+
+
+@lru_cache(maxsize=None)
+def _auth_headers(key):
+    return {
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+    }
+
+
+def anon_headers():
+    """Header auth dengan SUPABASE_API_KEY (anon). Mengembalikan salinan yang boleh diubah."""
+    return dict(_auth_headers(st.secrets["SUPABASE_API_KEY"]))
+
+
+def service_headers():
+    """Header auth dengan SUPABASE_SERVICE_ROLE. Mengembalikan salinan yang boleh diubah."""
+    return dict(_auth_headers(st.secrets["SUPABASE_SERVICE_ROLE"]))
+
+
+def _retry_after(res):
+    try:
+        return float(res.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def gagal_sebelum_terkirim(error):
+    """True jika request gagal saat membuka koneksi, sehingga server pasti belum menerima body.
+
+    Hanya connect timeout dan ConnectionError yang penyebabnya NewConnectionError (koneksi ditolak,
+    DNS gagal). ConnectionError lain, mis. 'Connection aborted' karena server memutus koneksi,
+    bisa terjadi setelah body diterima dan disimpan.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+
+
+def request(method, url, retries=RETRY_ATTEMPTS, deadline=RETRY_DEADLINE, **kwargs):
+    """Kirim request lewat session bersama dengan retry untuk error sementara.
+
+    Request diulang maksimal `retries` kali untuk status 5xx/429 dan error koneksi, dengan
+    backoff eksponensial + jitter, selama total waktu belum melewati `deadline` detik.
+    Status lain (termasuk 4xx) langsung dikembalikan. POST/PATCH hanya diulang jika server
+    jelas belum memproses request (429/503, atau gagal_sebelum_terkirim) agar data tidak ganda.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    retryable_status = RETRYABLE_STATUS if idempotent else RETRYABLE_STATUS_NON_IDEMPOTENT
+    give_up_at = time.monotonic() + deadline
+
+    attempt = 0
+    while True:
+        try:
+            res = get_session().request(method, url, **kwargs)
+            if res.status_code not in retryable_status:
+                return res
+            wait = _retry_after(res)
+            error = None
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not idempotent and not gagal_sebelum_terkirim(e):
+                raise
+            res, wait, error = None, None, e
+
+        attempt += 1
+        if wait is None:
+            wait = random.uniform(0, min(RETRY_MAX_BACKOFF, RETRY_BACKOFF * 2 ** attempt))
+        if attempt > retries or time.monotonic() + wait > give_up_at:
+            if error is not None:
+                raise error
+            return res
+        status = res.status_code if res is not None else error
+        print(f"🔁 Ulangi {method} {url} (percobaan ke-{attempt + 1}) dalam {wait:.2f} detik: {status}")
+        time.sleep(wait)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+
+from http.client import RemoteDisconnected
+
+import pytest
+import requests
+import streamlit as st
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import supabase_client  # noqa: E402
+
+SECRETS = {
+    "SUPABASE_URL": "https://contoh.supabase.co",
+    "SUPABASE_API_KEY": "anon-key",
+    "SUPABASE_SERVICE_ROLE": "service-key",
+}
+
+
+def koneksi_ditolak():
+    # Bentuk error requests saat koneksi TCP tidak bisa dibuka: body belum terkirim
+    return requests.ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "Connection refused")))
+
+
+def koneksi_terputus():
+    # Server memutus koneksi tanpa respons; body mungkin sudah diterima dan disimpan
+    return requests.ConnectionError(ProtocolError("Connection aborted.", RemoteDisconnected("Remote end closed connection without response")))
+
+
+class FakeResponse:
+    def __init__(self, status_code=201, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body
+        self.headers = headers or {}
+        self.text = json.dumps(body) if body is not None else ""
+
+    def json(self):
+        if self._body is None:
+            raise ValueError("body kosong")
+        return self._body
+
+
+class FakeSession:
+    """Pengganti requests.Session: mencatat setiap request dan menjawab lewat `handler`.
+
+    `handler(method, url, rows)` mengembalikan FakeResponse atau melempar exception requests;
+    `rows` adalah isi body JSON (list of dict) untuk POST, None untuk request lain.
+    """
+
+    def __init__(self, handler=None):
+        self.handler = handler or (lambda method, url, rows: FakeResponse(201))
+        self.calls = []
+
+    def request(self, method, url, data=None, **kwargs):
+        rows = json.loads(data) if data is not None else None
+        self.calls.append((method, url, rows))
+        return self.handler(method, url, rows)
+
+    def posted_rows(self):
+        return [row for method, _, rows in self.calls if method == "POST" and rows for row in rows]
+
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = FakeSession()
+    monkeypatch.setattr(st, "secrets", SECRETS)
+    monkeypatch.setattr(supabase_client, "get_session", lambda: fake)
+    # Tanpa jeda backoff agar test tetap cepat
+    monkeypatch.setattr(supabase_client, "RETRY_BACKOFF", 0)
+    return fake
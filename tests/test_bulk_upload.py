@@ -0,0 +1,183 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+import requests
+
+import bulk_upload
+from bulk_upload import MODE_INSERT, MODE_UPSERT
+from conftest import FakeResponse, koneksi_ditolak, koneksi_terputus
+from journal import UploadJournal
+from schema import DESTINASI_COLUMNS
+
+TABLE = "Destinasi Wisata"
+TANGGAL = "2025-01-01"
+
+
+def baris_destinasi(nomor):
+    return {
+        "Nama": f"Destinasi {nomor}",
+        "Kab_Kota": "Kabupaten Contoh",
+        "Kecamatan": "Kecamatan",
+        "Kelurahan_Desa": "Desa",
+        "Deskripsi": "Deskripsi",
+        "Fasilitas_Umum": "Toilet",
+        "Jarak_Ibukota": "10 km",
+        "Pengelola": "Swasta",
+        "Rating": 5,
+    }
+
+
+def siapkan(df):
+    df, error_mask = bulk_upload.siapkan_dataframe(df, TABLE)
+    valid, laporan = bulk_upload.validasi_dataframe(df, TABLE, error_mask)
+    return {"df": df, "valid": valid, "laporan": laporan}
+
+
+def kirim_utuh(prepared, batch_size, journal):
+    df_kirim = bulk_upload.siapkan_untuk_kirim(prepared["df"], TANGGAL)
+    return bulk_upload.kirim_dataframe(TABLE, df_kirim, batch_size, valid=prepared["valid"], journal=journal)
+
+
+def terima_semua(method, url, rows):
+    return FakeResponse(201)
+
+
+def gagal_jika_ada(nama, status=400):
+    """Handler yang menolak batch berisi baris `nama`, dan menerima batch lain."""
+    def handler(method, url, rows):
+        if rows and any(row["Nama"] == nama for row in rows):
+            return FakeResponse(status, {"message": "batch ditolak"})
+        return FakeResponse(201)
+    return handler
+
+
+def xlsx_upload(rows, name="destinasi.xlsx"):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(DESTINASI_COLUMNS)
+    for row in rows:
+        sheet.append([None] * len(DESTINASI_COLUMNS) if row is None else [row[col] for col in DESTINASI_COLUMNS])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+def test_resume_hanya_kirim_batch_yang_gagal(session, tmp_path):
+    prepared = siapkan(pd.DataFrame([baris_destinasi(i) for i in range(1, 11)]))
+    journal = UploadJournal("hash-resume", TABLE, path=tmp_path / "journal.sqlite3")
+    session.handler = gagal_jika_ada("Destinasi 4")
+
+    failed = kirim_utuh(prepared, 3, journal)
+
+    assert [(start, end) for start, end, _ in failed] == [(3, 6)]
+    assert journal.rentang == [(0, 3), (6, 10)]
+    # Jurnal dibaca ulang dari SQLite, seperti saat file yang sama diupload lagi
+    journal = UploadJournal("hash-resume", TABLE, path=tmp_path / "journal.sqlite3")
+    assert journal.rentang == [(0, 3), (6, 10)]
+    assert journal.jumlah_terkirim() == 7
+
+    session.calls.clear()
+    session.handler = terima_semua
+    failed = kirim_utuh(prepared, 3, journal)
+
+    assert failed == []
+    assert [row["Nama"] for row in session.posted_rows()] == ["Destinasi 4", "Destinasi 5", "Destinasi 6"]
+    assert journal.rentang == [(0, 10)]
+
+
+def test_resume_dari_streaming_ke_mode_utuh(session, tmp_path):
+    # Baris kosong di tengah sheet harus mendapat nomor yang sama di kedua mode baca
+    rows = [baris_destinasi(1), baris_destinasi(2), None, baris_destinasi(4), baris_destinasi(5),
+            baris_destinasi(6), baris_destinasi(7)]
+    path = tmp_path / "journal.sqlite3"
+    session.handler = gagal_jika_ada("Destinasi 5")
+
+    journal = UploadJournal("hash-xlsx", TABLE, path=path)
+    failed, _, laporan, _ = bulk_upload.kirim_file_streaming(TABLE, xlsx_upload(rows), TANGGAL, 2, journal=journal)
+    assert [(start, end) for start, end, _ in failed] == [(4, 6)]
+    assert list(laporan["Baris"]) == [3]
+    assert journal.rentang == [(0, 4), (6, 7)]
+
+    session.calls.clear()
+    session.handler = terima_semua
+    journal = UploadJournal("hash-xlsx", TABLE, path=path)
+    failed = kirim_utuh(siapkan(bulk_upload.baca_file(xlsx_upload(rows))), 2, journal)
+
+    assert failed == []
+    assert [row["Nama"] for row in session.posted_rows()] == ["Destinasi 5", "Destinasi 6"]
+    assert journal.rentang == [(0, 7)]
+
+
+@pytest.mark.parametrize("mode, status, jumlah_request", [
+    (MODE_INSERT, 502, 1),
+    (MODE_INSERT, 500, 1),
+    (MODE_INSERT, 503, 2),
+    (MODE_INSERT, 429, 2),
+    (MODE_UPSERT, 502, 2),
+    (MODE_UPSERT, 500, 2),
+])
+def test_retry_batch_sesuai_mode(session, mode, status, jumlah_request):
+    respons = iter([FakeResponse(status, {"message": "sementara"}), FakeResponse(201)])
+    session.handler = lambda method, url, rows: next(respons)
+
+    error = bulk_upload.kirim_batch_dengan_retry(TABLE, pd.DataFrame([baris_destinasi(1)]), mode)
+
+    assert len(session.calls) == jumlah_request
+    assert (error is None) == (jumlah_request == 2)
+
+
+@pytest.mark.parametrize("mode, exc, jumlah_request", [
+    (MODE_INSERT, koneksi_ditolak(), 2),
+    (MODE_INSERT, requests.ConnectTimeout("timeout koneksi"), 2),
+    (MODE_INSERT, koneksi_terputus(), 1),
+    (MODE_INSERT, requests.ReadTimeout("timeout baca"), 1),
+    (MODE_UPSERT, koneksi_terputus(), 2),
+    (MODE_UPSERT, requests.ReadTimeout("timeout baca"), 2),
+])
+def test_retry_error_koneksi_sesuai_mode(session, mode, exc, jumlah_request):
+    respons = iter([exc, FakeResponse(201)])
+
+    def handler(method, url, rows):
+        hasil = next(respons)
+        if isinstance(hasil, Exception):
+            raise hasil
+        return hasil
+
+    session.handler = handler
+    error = bulk_upload.kirim_batch_dengan_retry(TABLE, pd.DataFrame([baris_destinasi(1)]), mode)
+
+    assert len(session.calls) == jumlah_request
+    assert (error is None) == (jumlah_request == 2)
+
+
+def test_streaming_dan_mode_utuh_membaca_baris_sama():
+    rows = [baris_destinasi(1), None, None, baris_destinasi(4), None]
+    utuh = bulk_upload.baca_file(xlsx_upload(rows))
+    streaming = pd.concat(list(bulk_upload.iter_file_chunks(xlsx_upload(rows), 2)))
+    pd.testing.assert_frame_equal(streaming.isna(), utuh.isna())
+    pd.testing.assert_frame_equal(streaming.fillna(""), utuh.fillna(""), check_dtype=False)
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_file_tanpa_template_dikirim_tanpa_validasi_kolom_wajib(session, streaming):
+    # Kolom tidak cocok dengan template mana pun: dikirim ke tabel default, sama di kedua mode
+    def csv_upload():
+        buffer = io.BytesIO(b"Foo,Bar\na,1\nb,2\n")
+        buffer.name = "lain.csv"
+        return buffer
+
+    if streaming:
+        hasil = bulk_upload.proses_upload(None, TANGGAL, 500, MODE_INSERT, uploaded_file=csv_upload())
+    else:
+        prepared = bulk_upload.baca_dan_siapkan(csv_upload())
+        assert prepared["table_name"] is None
+        hasil = bulk_upload.proses_upload(prepared["table_name"], TANGGAL, 500, MODE_INSERT, prepared=prepared)
+
+    assert hasil["failed"] == []
+    assert hasil["laporan"].empty
+    assert [row["Foo"] for row in session.posted_rows()] == ["a", "b"]
+    assert all(url.endswith("/rest/v1/Destinasi%20Wisata") for _, url, _ in session.calls)
@@ -0,0 +1,46 @@
+import pytest
+import requests
+
+import supabase_client
+from conftest import FakeResponse, koneksi_ditolak, koneksi_terputus
+
+URL = "https://contoh.supabase.co/rest/v1/Industri"
+
+
+def gagal_lalu_berhasil(session, exc):
+    respons = iter([exc, FakeResponse(201)])
+
+    def handler(method, url, rows):
+        hasil = next(respons)
+        if isinstance(hasil, Exception):
+            raise hasil
+        return hasil
+
+    session.handler = handler
+
+
+@pytest.mark.parametrize("method, exc, jumlah_request", [
+    ("POST", koneksi_ditolak(), 2),
+    ("POST", requests.ConnectTimeout("timeout koneksi"), 2),
+    ("POST", koneksi_terputus(), 1),
+    ("POST", requests.ReadTimeout("timeout baca"), 1),
+    ("GET", koneksi_terputus(), 2),
+    ("GET", requests.ReadTimeout("timeout baca"), 2),
+])
+def test_retry_error_koneksi_sesuai_method(session, method, exc, jumlah_request):
+    gagal_lalu_berhasil(session, exc)
+
+    if jumlah_request == 1:
+        with pytest.raises(type(exc)):
+            supabase_client.request(method, URL, data=b"[]")
+    else:
+        assert supabase_client.request(method, URL, data=b"[]").status_code == 201
+    assert len(session.calls) == jumlah_request
+
+
+def test_gagal_sebelum_terkirim():
+    assert supabase_client.gagal_sebelum_terkirim(koneksi_ditolak())
+    assert supabase_client.gagal_sebelum_terkirim(requests.ConnectTimeout("timeout koneksi"))
+    assert not supabase_client.gagal_sebelum_terkirim(koneksi_terputus())
+    assert not supabase_client.gagal_sebelum_terkirim(requests.ReadTimeout("timeout baca"))
+    assert not supabase_client.gagal_sebelum_terkirim(requests.ConnectionError("tanpa penyebab"))
@@ -0,0 +1,57 @@
+import utils
+from conftest import FakeResponse
+
+KABUPATEN = ["Kabupaten Sleman", "Kabupaten Bantul", "Kota Yogyakarta"]
+
+
+def rpc_tidak_ada(handler):
+    """Handler yang menjawab 404 untuk RPC dan meneruskan request lain ke `handler`."""
+    def wrapper(method, url, rows):
+        if "/rpc/" in url:
+            return FakeResponse(404, {"message": "function not found"})
+        return handler(method, url, rows)
+    return wrapper
+
+
+def test_progres_lewat_rpc_satu_request(session):
+    session.handler = lambda method, url, rows: FakeResponse(200, [
+        {"kabupaten": "Kabupaten Sleman", "jumlah_destinasi": 4, "jumlah_industri": 7},
+        {"kabupaten": "Kota Yogyakarta", "jumlah_destinasi": 2, "jumlah_industri": 0},
+    ])
+
+    destinasi, industri, errors = utils.get_progres_kabupaten(KABUPATEN)
+
+    assert len(session.calls) == 1
+    assert session.calls[0][0] == "POST" and session.calls[0][1].endswith("/rest/v1/rpc/hitung_progres_kabupaten")
+    assert destinasi == {"Kabupaten Sleman": 4, "Kabupaten Bantul": 0, "Kota Yogyakarta": 2}
+    assert industri == {"Kabupaten Sleman": 7, "Kabupaten Bantul": 0, "Kota Yogyakarta": 0}
+    assert errors == {}
+
+
+def test_progres_fallback_per_kabupaten(session):
+    session.handler = rpc_tidak_ada(lambda method, url, rows: FakeResponse(200, [{"count": 3 if "Industri" in url else 5}]))
+
+    destinasi, industri, errors = utils.get_progres_kabupaten(KABUPATEN)
+
+    gets = [url for method, url, _ in session.calls if method == "GET"]
+    assert len(gets) == 2 * len(KABUPATEN)
+    assert sum("/rest/v1/Industri?" in url for url in gets) == len(KABUPATEN)
+    assert destinasi == {kab: 5 for kab in KABUPATEN}
+    assert industri == {kab: 3 for kab in KABUPATEN}
+    assert errors == {}
+
+
+def test_progres_fallback_hitungan_gagal_bernilai_none(session):
+    def handler(method, url, rows):
+        if "/rest/v1/Industri?" in url and "bantul" in url:
+            return FakeResponse(400, {"message": "query gagal"})
+        return FakeResponse(200, [{"count": 1}])
+
+    session.handler = rpc_tidak_ada(handler)
+
+    destinasi, industri, errors = utils.get_progres_kabupaten(KABUPATEN)
+
+    assert destinasi == {kab: 1 for kab in KABUPATEN}
+    assert industri == {"Kabupaten Sleman": 1, "Kabupaten Bantul": None, "Kota Yogyakarta": 1}
+    assert list(errors) == [("Industri", "Kabupaten Bantul")]
+    assert "400" in errors[("Industri", "Kabupaten Bantul")]
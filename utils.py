@@ -3,76 +3,225 @@ import time
 import streamlit as st
 import urllib.parse
 import re
+import base64
+import hashlib
+import hmac
+import json
+import supabase_client
+from cache import TTLCache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+try:
+    import jwt as pyjwt  # PyJWT (opsional), hanya dibutuhkan untuk verifikasi JWKS RS256/ES256
+except ImportError:
+    pyjwt = None
+
+# Cache data referensi user_info bersama untuk semua sesi Streamlit dalam satu proses
+USER_INFO_CACHE_TTL = 600
+user_info_cache = TTLCache(maxsize=1024, ttl=USER_INFO_CACHE_TTL)
+
+def invalidate_user_info_cache(email=None):
+    """Hapus cache user_info; hanya untuk satu email jika `email` diisi, sisanya semua entri."""
+    if email is None:
+        user_info_cache.clear()
+    else:
+        user_info_cache.invalidate(("kabupaten_by_email", email.strip().lower()))
+        user_info_cache.invalidate(("all_kabupaten",))
+
+def user_info_cache_stats():
+    return user_info_cache.stats()
+
+def get_kabupaten_by_email(email):
+    email = email.strip().lower()
+    cache_key = ("kabupaten_by_email", email)
+    cached = user_info_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-def get_kabupaten_by_email(email, retries=5, delay=1):
     try:
         SUPABASE_URL = st.secrets["SUPABASE_URL"]
-        SERVICE_ROLE_KEY = st.secrets["SUPABASE_SERVICE_ROLE"]
+        headers = supabase_client.service_headers()
     except KeyError as e:
         print(f"❌ Missing secret: {e}")
         return None
 
-    email = email.strip().lower()
     encoded_email = urllib.parse.quote(email, safe='')
     endpoint = f"{SUPABASE_URL}/rest/v1/user_info?email=eq.{encoded_email}"
 
-    headers = {
-        "apikey": SERVICE_ROLE_KEY,
-        "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
-    }
+    # Retry untuk error sementara ditangani supabase_client; hasil kosong berarti email memang tidak terdaftar
+    try:
+        res = supabase_client.get(endpoint, headers=headers)
+        print(f"🧪 Status {res.status_code}, Respon: {res.text}")
+        if res.status_code == 200:
+            data = res.json()
+            print(f"📦 Data ditemukan: {data}")
+            if data:
+                kabupaten = data[0]["kabupaten_kota"]
+                user_info_cache.set(cache_key, kabupaten)
+                return kabupaten
+        else:
+            print(f"❌ Gagal mengambil data: Status {res.status_code}, Error: {res.text}")
+    except requests.RequestException as e:
+        print(f"❌ Gagal mengambil data user_info: {e}")
+
+    return None
+
+# Verifikasi token lokal: aktif jika SUPABASE_JWT_SECRET (HS256) atau SUPABASE_JWKS_URL diisi di secrets
+JWT_AUDIENCE = "authenticated"
+JWT_LEEWAY = 30
+VERIFIED_TOKEN_CACHE_TTL = 300
+verified_token_cache = TTLCache(maxsize=512, ttl=VERIFIED_TOKEN_CACHE_TTL)
+jwks_cache = TTLCache(maxsize=4, ttl=3600)
+
+class TokenInvalid(Exception):
+    pass
+
+def _b64url_decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _decode_jwt_unverified(token):
+    header_b64, payload_b64, signature_b64 = token.split(".")
+    header = json.loads(_b64url_decode(header_b64))
+    payload = json.loads(_b64url_decode(payload_b64))
+    return header, payload, signature_b64
+
+def _check_claims(claims):
+    now = time.time()
+    if "exp" not in claims or claims["exp"] < now - JWT_LEEWAY:
+        raise TokenInvalid("Token kedaluwarsa")
+    audience = claims.get("aud")
+    audiences = audience if isinstance(audience, list) else [audience]
+    if JWT_AUDIENCE not in audiences:
+        raise TokenInvalid(f"Audience token tidak valid: {audience}")
+    return claims
 
-    for attempt in range(retries):
+def _get_jwks(jwks_url):
+    jwks = jwks_cache.get(jwks_url)
+    if jwks is None:
+        res = supabase_client.get(jwks_url, headers=supabase_client.anon_headers())
+        res.raise_for_status()
+        jwks = res.json()
+        jwks_cache.set(jwks_url, jwks)
+    return jwks
+
+def verify_token_locally(token):
+    """Verifikasi signature, expiry dan audience access token Supabase tanpa memanggil /auth/v1/user.
+
+    Mengembalikan klaim token, atau None jika token tidak bisa diverifikasi secara lokal
+    (mode lokal tidak dikonfigurasi, algoritma/JWKS tidak didukung). Token yang jelas tidak
+    valid memunculkan TokenInvalid.
+    """
+    jwt_secret = st.secrets.get("SUPABASE_JWT_SECRET")
+    jwks_url = st.secrets.get("SUPABASE_JWKS_URL")
+    if not jwt_secret and not jwks_url:
+        return None
+
+    try:
+        header, claims, signature_b64 = _decode_jwt_unverified(token)
+    except (ValueError, TypeError) as e:
+        raise TokenInvalid(f"Format token tidak valid: {e}")
+
+    alg = header.get("alg")
+    if alg == "HS256" and jwt_secret:
+        signing_input = token.rsplit(".", 1)[0].encode()
+        expected = hmac.new(jwt_secret.encode(), signing_input, hashlib.sha256).digest()
         try:
-            res = requests.get(endpoint, headers=headers)
-            print(f"🧪 Coba ke-{attempt+1}: Status {res.status_code}, Respon: {res.text}")
-            if res.status_code == 200:
-                data = res.json()
-                print(f"📦 Data ditemukan: {data}")
-                if data:
-                    return data[0]["kabupaten_kota"]
-            else:
-                print(f"❌ Gagal mengambil data: Status {res.status_code}, Error: {res.text}")
-        except requests.RequestException as e:
-            print(f"❌ Error pada percobaan ke-{attempt+1}: {e}")
-        time.sleep(delay)
+            signature = _b64url_decode(signature_b64)
+        except ValueError:
+            raise TokenInvalid("Signature token tidak valid")
+        if not hmac.compare_digest(expected, signature):
+            raise TokenInvalid("Signature token tidak valid")
+        return _check_claims(claims)
+
+    if alg in ("RS256", "ES256") and jwks_url and pyjwt is not None:
+        try:
+            jwks = _get_jwks(jwks_url)
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠️ Gagal mengambil JWKS: {e}")
+            return None
+        jwk = next((key for key in jwks.get("keys", []) if key.get("kid") == header.get("kid")), None)
+        if jwk is None:
+            jwks_cache.invalidate(jwks_url)
+            return None
+        try:
+            key = pyjwt.PyJWK(jwk).key
+            pyjwt.decode(token, key, algorithms=[alg], audience=JWT_AUDIENCE, leeway=JWT_LEEWAY)
+        except pyjwt.PyJWTError as e:
+            raise TokenInvalid(str(e))
+        return _check_claims(claims)
 
     return None
 
 def get_email_from_token(token):
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = verified_token_cache.get(cache_key)
+    if cached is not None:
+        email, exp = cached
+        if exp is None or exp > time.time():
+            return email
+        verified_token_cache.invalidate(cache_key)
+
+    try:
+        claims = verify_token_locally(token)
+    except TokenInvalid as e:
+        print(f"❌ Token ditolak saat verifikasi lokal: {e}")
+        return None
+    if claims is not None and claims.get("email"):
+        print("🔍 Verifikasi token lokal berhasil")
+        _cache_verified_token(cache_key, claims["email"], claims.get("exp"))
+        return claims["email"]
+
+    # Fallback: verifikasi lewat Supabase Auth
     try:
         url = f"{st.secrets['SUPABASE_URL']}/auth/v1/user"
         headers = {
+            **supabase_client.anon_headers(),
             "Authorization": f"Bearer {token}",
-            "apikey": st.secrets['SUPABASE_API_KEY']
         }
-        res = requests.get(url, headers=headers)
+        res = supabase_client.get(url, headers=headers)
         print(f"🔍 Verifikasi token: Status {res.status_code}, Respon: {res.text}")
         if res.status_code == 200:
-            return res.json().get("email")
+            email = res.json().get("email")
+            if email:
+                try:
+                    exp = _decode_jwt_unverified(token)[1].get("exp")
+                except (ValueError, TypeError):
+                    exp = None
+                _cache_verified_token(cache_key, email, exp)
+            return email
         return None
     except requests.RequestException as e:
         print(f"❌ Gagal verifikasi token: {e}")
         return None
 
+def _cache_verified_token(cache_key, email, exp):
+    ttl = VERIFIED_TOKEN_CACHE_TTL
+    if exp is not None:
+        ttl = min(ttl, max(0, exp - time.time()))
+    if ttl > 0:
+        verified_token_cache.set(cache_key, (email, exp), ttl=ttl)
+
 def get_all_kabupaten():
+    cache_key = ("all_kabupaten",)
+    cached = user_info_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
     try:
         SUPABASE_URL = st.secrets["SUPABASE_URL"]
-        SERVICE_ROLE_KEY = st.secrets["SUPABASE_SERVICE_ROLE"]
+        headers = supabase_client.service_headers()
     except KeyError as e:
         print(f"❌ Missing secret: {e}")
         return []
 
     endpoint = f"{SUPABASE_URL}/rest/v1/user_info?select=kabupaten_kota"
-    headers = {
-        "apikey": SERVICE_ROLE_KEY,
-        "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
-    }
-
     try:
-        res = requests.get(endpoint, headers=headers)
+        res = supabase_client.get(endpoint, headers=headers)
         if res.status_code == 200:
             data = res.json()
             kabupaten_list = sorted(set(item["kabupaten_kota"] for item in data if item["kabupaten_kota"] != "admin"))
+            user_info_cache.set(cache_key, tuple(kabupaten_list))
             return kabupaten_list
         else:
             print(f"❌ Gagal mengambil data kabupaten: Status {res.status_code}, Error: {res.text}")
@@ -81,39 +230,221 @@ def get_all_kabupaten():
         print(f"❌ Gagal mengambil data kabupaten: {e}")
         return []
 
-def get_count_by_kabupaten(table_name, kabupaten_list, kab_column="Kab_Kota"):
+def normalisasi_kabupaten(kab):
+    # Normalisasi nama kabupaten dengan lebih menyeluruh
+    return re.sub(r'\s+', ' ', kab.lower().replace("kabupaten ", "").replace("kab. ", "").replace("kab ", "")).strip()
+
+def fetch_concurrently(tasks, max_workers=8):
+    """Jalankan beberapa fungsi tanpa argumen secara paralel dengan batas jumlah worker.
+
+    `tasks` adalah dict {key: callable}. Mengembalikan tuple (results, errors):
+    hasil dari task yang berhasil dan pesan error dari task yang gagal, keduanya per key.
+    """
+    results = {}
+    errors = {}
+    if not tasks:
+        return results, errors
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        futures = {executor.submit(fn): key for key, fn in tasks.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                errors[key] = str(e)
+    return results, errors
+
+def get_progres_kabupaten(kabupaten_list, max_workers=8):
+    """Hitung jumlah Destinasi Wisata dan Industri per kabupaten dalam satu request.
+
+    Memanggil RPC `hitung_progres_kabupaten` (lihat sql/hitung_progres_kabupaten.sql).
+    Jika RPC belum tersedia, kembali ke hitungan per kabupaten yang dijalankan paralel.
+    Mengembalikan tuple (destinasi_counts, industri_counts, errors); kabupaten yang gagal
+    dihitung bernilai None dan pesan errornya ada di `errors` dengan key (tabel, kabupaten).
+    """
     try:
         SUPABASE_URL = st.secrets["SUPABASE_URL"]
-        SUPABASE_API_KEY = st.secrets["SUPABASE_API_KEY"]
+        headers = supabase_client.anon_headers()
     except KeyError as e:
         print(f"❌ Missing secret: {e}")
-        return {kab: 0 for kab in kabupaten_list}
+        errors = {("Konfigurasi", kab): f"Missing secret: {e}" for kab in kabupaten_list}
+        return {kab: None for kab in kabupaten_list}, {kab: None for kab in kabupaten_list}, errors
+
+    headers["Content-Type"] = "application/json"
+    payload = {
+        "kabupaten_list": list(kabupaten_list),
+        "pola_list": [normalisasi_kabupaten(kab) for kab in kabupaten_list],
+    }
+
+    try:
+        res = supabase_client.post(f"{SUPABASE_URL}/rest/v1/rpc/hitung_progres_kabupaten", json=payload, headers=headers)
+        if res.status_code == 200:
+            destinasi_counts = {kab: 0 for kab in kabupaten_list}
+            industri_counts = {kab: 0 for kab in kabupaten_list}
+            for row in res.json():
+                if row["kabupaten"] in destinasi_counts:
+                    destinasi_counts[row["kabupaten"]] = row["jumlah_destinasi"]
+                    industri_counts[row["kabupaten"]] = row["jumlah_industri"]
+            print(f"✅ Progres {len(kabupaten_list)} kabupaten diambil lewat RPC")
+            return destinasi_counts, industri_counts, {}
+        print(f"⚠️ RPC hitung_progres_kabupaten gagal: Status {res.status_code}, Error: {res.text}")
+    except requests.RequestException as e:
+        print(f"⚠️ RPC hitung_progres_kabupaten gagal: {e}")
 
-    headers = {
-        "apikey": SUPABASE_API_KEY,
-        "Authorization": f"Bearer {SUPABASE_API_KEY}",
+    # Fallback: hitung per kabupaten untuk kedua tabel sekaligus, masing-masing dengan separuh worker
+    tables = ["Destinasi%20Wisata", "Industri"]
+    per_table_workers = max(1, max_workers // len(tables))
+    tasks = {
+        table_name: partial(get_count_by_kabupaten, table_name, kabupaten_list, "Kab_Kota", per_table_workers)
+        for table_name in tables
     }
+    results, table_errors = fetch_concurrently(tasks, max_workers=len(tables))
 
-    count_by_kabupaten = {kab: 0 for kab in kabupaten_list}
+    counts = {}
+    errors = {}
+    for table_name in tables:
+        if table_name in table_errors:
+            counts[table_name] = {kab: None for kab in kabupaten_list}
+            errors.update({(table_name, kab): table_errors[table_name] for kab in kabupaten_list})
+            continue
+        counts[table_name], kab_errors = results[table_name]
+        errors.update({(table_name, kab): error for kab, error in kab_errors.items()})
+    return counts["Destinasi%20Wisata"], counts["Industri"], errors
 
-    for kab in kabupaten_list:
-        try:
-            # Normalisasi nama kabupaten dengan lebih menyeluruh
-            normalized_kab = re.sub(r'\s+', ' ', kab.lower().replace("kabupaten ", "").replace("kab. ", "").replace("kab ", "")).strip()
-            # Gunakan ilike untuk pencocokan fleksibel
-            query = f"{kab_column}=ilike.*{urllib.parse.quote(normalized_kab)}*"
-            endpoint = f"{SUPABASE_URL}/rest/v1/{table_name}?{query}&select=count"
-            print(f"🔍 Query untuk {kab} (normalized: {normalized_kab}): {endpoint}")
-            res = requests.get(endpoint, headers=headers)
-            if res.status_code == 200:
-                data = res.json()
-                count = data[0]["count"] if data else 0
-                count_by_kabupaten[kab] = count
-                print(f"✅ Berhasil mengambil data dari {table_name} untuk {kab}: Count = {count}")
-            else:
-                print(f"❌ Gagal mengambil data dari {table_name} untuk {kab}: Status {res.status_code}, Error: {res.text}")
-        except requests.RequestException as e:
-            print(f"❌ Gagal mengambil data dari {table_name} untuk {kab}: {e}")
-            count_by_kabupaten[kab] = 0
-
-    return count_by_kabupaten
\ No newline at end of file
+def _count_satu_kabupaten(supabase_url, headers, table_name, kab, kab_column):
+    normalized_kab = normalisasi_kabupaten(kab)
+    # Gunakan ilike untuk pencocokan fleksibel
+    query = f"{kab_column}=ilike.*{urllib.parse.quote(normalized_kab)}*"
+    endpoint = f"{supabase_url}/rest/v1/{table_name}?{query}&select=count"
+    print(f"🔍 Query untuk {kab} (normalized: {normalized_kab}): {endpoint}")
+    res = supabase_client.get(endpoint, headers=headers)
+    if res.status_code != 200:
+        print(f"❌ Gagal mengambil data dari {table_name} untuk {kab}: Status {res.status_code}, Error: {res.text}")
+        raise RuntimeError(f"Status {res.status_code}: {res.text}")
+    data = res.json()
+    count = data[0]["count"] if data else 0
+    print(f"✅ Berhasil mengambil data dari {table_name} untuk {kab}: Count = {count}")
+    return count
+
+def get_count_by_kabupaten(table_name, kabupaten_list, kab_column="Kab_Kota", max_workers=8):
+    """Hitung jumlah baris `table_name` per kabupaten, satu request per kabupaten secara paralel.
+
+    Mengembalikan tuple (count_by_kabupaten, errors); kabupaten yang gagal bernilai None.
+    """
+    try:
+        SUPABASE_URL = st.secrets["SUPABASE_URL"]
+        headers = supabase_client.anon_headers()
+    except KeyError as e:
+        print(f"❌ Missing secret: {e}")
+        return {kab: None for kab in kabupaten_list}, {kab: f"Missing secret: {e}" for kab in kabupaten_list}
+
+    tasks = {
+        kab: partial(_count_satu_kabupaten, SUPABASE_URL, headers, table_name, kab, kab_column)
+        for kab in kabupaten_list
+    }
+    results, errors = fetch_concurrently(tasks, max_workers=max_workers)
+    count_by_kabupaten = {kab: results.get(kab) for kab in kabupaten_list}
+    return count_by_kabupaten, errors
+
+# Indeks lokal Nama_Usaha yang sudah diketahui ada / tidak ada di tabel Industri, disegarkan lewat TTL
+NAMA_USAHA_INDEX_TTL = 300
+# Batas panjang nilai filter in.(...) per request agar URL tetap pendek
+DUPLICATE_LOOKUP_MAX_CHARS = 4000
+nama_usaha_index = TTLCache(maxsize=100000, ttl=NAMA_USAHA_INDEX_TTL)
+
+def _postgrest_quote(value):
+    # Nilai di dalam in.(...) diberi tanda kutip ganda agar koma/kurung di nama usaha aman
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _kelompokkan_nama(names, max_chars=DUPLICATE_LOOKUP_MAX_CHARS):
+    group, length = [], 0
+    for name in names:
+        quoted = urllib.parse.quote(_postgrest_quote(name), safe="")
+        if group and length + len(quoted) + 1 > max_chars:
+            yield group
+            group, length = [], 0
+        group.append(name)
+        length += len(quoted) + 1
+    if group:
+        yield group
+
+def _cari_nama_usaha(supabase_url, headers, names):
+    values = ",".join(_postgrest_quote(name) for name in names)
+    endpoint = f"{supabase_url}/rest/v1/Industri?select=Nama_Usaha&Nama_Usaha=in.({urllib.parse.quote(values, safe='')})"
+    res = supabase_client.get(endpoint, headers=headers)
+    if res.status_code != 200:
+        raise RuntimeError(f"Status {res.status_code}: {res.text}")
+    return {row["Nama_Usaha"] for row in res.json()}
+
+def cari_nama_usaha_terdaftar(names, max_workers=4):
+    """Cari Nama_Usaha mana saja yang sudah ada di tabel Industri.
+
+    Nama yang belum ada di indeks lokal dicek dengan filter `in.(...)`, beberapa ratus nama per
+    request. Mengembalikan tuple (terdaftar, errors): set nama yang sudah ada, dan dict error per
+    kelompok yang gagal dicek (nama di kelompok itu dianggap belum terdaftar).
+    """
+    names = {name for name in names if name}
+    terdaftar = set()
+    belum_diketahui = []
+    for name in names:
+        known = nama_usaha_index.get(name)
+        if known is None:
+            belum_diketahui.append(name)
+        elif known:
+            terdaftar.add(name)
+    if not belum_diketahui:
+        return terdaftar, {}
+
+    try:
+        SUPABASE_URL = st.secrets["SUPABASE_URL"]
+        headers = supabase_client.anon_headers()
+    except KeyError as e:
+        print(f"❌ Missing secret: {e}")
+        return terdaftar, {"Konfigurasi": f"Missing secret: {e}"}
+
+    groups = list(_kelompokkan_nama(sorted(belum_diketahui)))
+    tasks = {i: partial(_cari_nama_usaha, SUPABASE_URL, headers, group) for i, group in enumerate(groups)}
+    results, errors = fetch_concurrently(tasks, max_workers=max_workers)
+    for i, found in results.items():
+        for name in groups[i]:
+            nama_usaha_index.set(name, name in found)
+        terdaftar |= found
+    print(f"🔍 Cek duplikat {len(belum_diketahui)} Nama_Usaha dalam {len(groups)} request, {len(errors)} gagal")
+    return terdaftar, errors
+
+def tandai_nama_usaha_terdaftar(names):
+    """Catat Nama_Usaha yang baru saja berhasil disimpan ke indeks lokal."""
+    for name in names:
+        if name:
+            nama_usaha_index.set(name, True)
+
+def ambil_baris_by_in(table_name, column, values, select, max_workers=4):
+    """Ambil baris `table_name` yang nilai `column`-nya ada di `values`, beberapa ratus nilai per request.
+
+    Mengembalikan tuple (rows, errors): daftar dict kolom `select`, dan error per kelompok yang gagal.
+    """
+    values = sorted({value for value in values if value})
+    if not values:
+        return [], {}
+    try:
+        SUPABASE_URL = st.secrets["SUPABASE_URL"]
+        headers = supabase_client.anon_headers()
+    except KeyError as e:
+        print(f"❌ Missing secret: {e}")
+        return [], {"Konfigurasi": f"Missing secret: {e}"}
+
+    select_param = urllib.parse.quote(",".join(select), safe=",")
+
+    def ambil(group):
+        in_values = urllib.parse.quote(",".join(_postgrest_quote(value) for value in group), safe="")
+        endpoint = f"{SUPABASE_URL}/rest/v1/{urllib.parse.quote(table_name)}?select={select_param}&{urllib.parse.quote(column)}=in.({in_values})"
+        res = supabase_client.get(endpoint, headers=headers)
+        if res.status_code != 200:
+            raise RuntimeError(f"Status {res.status_code}: {res.text}")
+        return res.json()
+
+    groups = list(_kelompokkan_nama(values))
+    results, errors = fetch_concurrently({i: partial(ambil, group) for i, group in enumerate(groups)}, max_workers=max_workers)
+    rows = [row for i in sorted(results) for row in results[i]]
+    return rows, errors
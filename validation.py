@@ -0,0 +1,125 @@
+import pandas as pd
+
+from schema import INTEGER, coerce_dataframe, schema_for
+
+JENIS_INDUSTRI = ["Travel", "Hotel", "Wisma", "Villa", "Homestay", "Restoran", "Rumah Makan", "Catering", "Spa", "Usaha Hiburan"]
+JENIS_KONTAK = ["Whatsapp", "Instagram", "Email"]
+JENIS_HIBURAN = ["Club Malam", "Karaoke", "Diskotik", "Billiard"]
+PENGELOLA = ["Pemerintah", "Swasta", "Lainnya"]
+
+# Kolom yang wajib diisi untuk semua baris
+KOLOM_WAJIB = {
+    "Destinasi Wisata": ["Nama", "Kab_Kota", "Kecamatan", "Kelurahan_Desa", "Deskripsi", "Pengelola"],
+    "Industri": ["Nama_Usaha", "Jenis_Industri", "Jenis_Kontak", "Kontak", "Kab_Kota", "Kecamatan", "Kelurahan_Desa"],
+}
+
+# Kolom tambahan yang wajib diisi per Jenis_Industri (sama dengan Form Industri)
+KOLOM_WAJIB_PER_JENIS = [
+    (["Hotel", "Wisma", "Villa", "Homestay"], ["Dapur_Halal", "NIB_Available", "CHSE", "Fasilitas", "Jumlah_Kamar", "Jumlah_Bed"]),
+    (["Restoran", "Rumah Makan"], ["NIB_Available", "CHSE", "Fasilitas", "Jumlah_Kursi"]),
+    (["Spa"], ["NIB_Available", "Standar_Available"]),
+    (["Catering"], ["NIB_Available", "Trapis_Available"]),
+    (["Travel"], ["NIB_Available"]),
+    (["Usaha Hiburan"], ["NIB_Available", "Standar_Available", "Jenis_Hiburan"]),
+]
+
+# (kolom_syarat, kolom_wajib): kolom_wajib harus diisi jika kolom_syarat bernilai True
+KOLOM_WAJIB_BERSYARAT = [
+    ("NIB_Available", "NIB"),
+    ("Standar_Available", "Sertifikat_Standar"),
+    ("Trapis_Available", "Trapis"),
+]
+
+# Nilai yang diperbolehkan untuk kolom pilihan (kosong tetap diperbolehkan jika kolom tidak wajib)
+PILIHAN = {
+    "Jenis_Industri": JENIS_INDUSTRI,
+    "Jenis_Kontak": JENIS_KONTAK,
+    "Jenis_Hiburan": JENIS_HIBURAN,
+    "Pengelola": PENGELOLA,
+}
+
+RENTANG = {
+    "Rating": (1, 10),
+    "Bintang_Hotel": (0, 5),
+}
+
+
+def _terisi(df, col, col_type):
+    if col not in df.columns:
+        return pd.Series(False, index=df.index)
+    series = df[col]
+    # Sama seperti Form Industri: angka 0 dianggap belum diisi
+    if col_type == INTEGER:
+        return (series.fillna(0) > 0).astype(bool)
+    return series.notna().astype(bool)
+
+
+def validasi_masks(df, table_name, error_mask=None):
+    """Jalankan semua aturan secara tervektorisasi pada DataFrame yang sudah dikonversi.
+
+    Mengembalikan dict {pesan: mask} dengan mask boolean True untuk baris yang melanggar aturan.
+    `error_mask` dari schema.coerce_dataframe (opsional) ikut dilaporkan sebagai format tidak valid.
+    """
+    schema = schema_for(table_name)
+    masks = {}
+
+    if error_mask is not None:
+        for col in error_mask.columns:
+            if error_mask[col].any():
+                masks[f"Format {col} tidak valid"] = error_mask[col].to_numpy()
+
+    for col in KOLOM_WAJIB.get(table_name, []):
+        masks[f"{col} wajib diisi"] = ~_terisi(df, col, schema.get(col)).to_numpy()
+
+    if table_name == "Industri" and "Jenis_Industri" in df.columns:
+        jenis = df["Jenis_Industri"]
+        for jenis_list, kolom_list in KOLOM_WAJIB_PER_JENIS:
+            rows = jenis.isin(jenis_list).fillna(False).astype(bool).to_numpy()
+            if not rows.any():
+                continue
+            for col in kolom_list:
+                pesan = f"{col} wajib diisi untuk {'/'.join(jenis_list)}"
+                masks[pesan] = rows & ~_terisi(df, col, schema.get(col)).to_numpy()
+
+        for syarat, col in KOLOM_WAJIB_BERSYARAT:
+            if syarat in df.columns:
+                rows = df[syarat].fillna(False).astype(bool).to_numpy()
+                masks[f"{col} wajib diisi jika {syarat} = Ya"] = rows & ~_terisi(df, col, schema.get(col)).to_numpy()
+
+    for col, pilihan in PILIHAN.items():
+        if col in df.columns and col in schema:
+            series = df[col]
+            masks[f"{col} harus salah satu dari: {', '.join(pilihan)}"] = (series.notna() & ~series.isin(pilihan)).fillna(False).astype(bool).to_numpy()
+
+    for col, (minimum, maksimum) in RENTANG.items():
+        if col in df.columns and col in schema:
+            series = df[col]
+            masks[f"{col} harus antara {minimum} dan {maksimum}"] = (series.notna() & ((series < minimum) | (series > maksimum))).fillna(False).astype(bool).to_numpy()
+
+    return {pesan: mask for pesan, mask in masks.items() if mask.any()}
+
+
+def validasi_dataframe(df, table_name, error_mask=None, offset=0):
+    """Validasi seluruh DataFrame. Mengembalikan (valid, laporan).
+
+    `valid` adalah Series boolean per baris; `laporan` DataFrame berkolom Baris (1-based,
+    ditambah `offset` untuk potongan file) dan Masalah, satu baris per baris data yang ditolak.
+    """
+    masks = validasi_masks(df, table_name, error_mask)
+    if not masks:
+        return pd.Series(True, index=df.index), pd.DataFrame(columns=["Baris", "Masalah"])
+
+    pesan = list(masks)
+    matrix = pd.DataFrame(masks, index=df.index).to_numpy()
+    invalid = matrix.any(axis=1)
+    laporan = pd.DataFrame({
+        "Baris": invalid.nonzero()[0] + 1 + offset,
+        "Masalah": ["; ".join(p for p, flag in zip(pesan, flags) if flag) for flags in matrix[invalid]],
+    })
+    return pd.Series(~invalid, index=df.index), laporan
+
+
+def validasi_record(record, table_name):
+    """Validasi satu record (mis. dari form) dengan aturan yang sama. Mengembalikan daftar pesan masalah."""
+    df, error_mask = coerce_dataframe(pd.DataFrame([record]), table_name)
+    return list(validasi_masks(df, table_name, error_mask))